@@ -2,12 +2,15 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from utils import load_data, calculate_kpi, filter_by_date, HSE_COLOR_MAP
+from utils import load_data, filter_by_date, HSE_COLOR_MAP
 from datetime import datetime, timedelta
 import folium
-from streamlit_folium import st_folium
 from folium.plugins import HeatMap
-from utils import render_sidebar, set_header_title
+from utils import render_sidebar, set_header_title, tile_url
+from analytics import aggregate, period_matrix
+from kpi import get_kpis, format_duration
+from geo import cached_map_html, heat_data, location_weights
+from perf import instrument, timed
 import streamlit.components.v1 as components
 from plotly.subplots import make_subplots
 from branca.element import MacroElement, Template
@@ -33,38 +36,20 @@ df_master_filtered, df_exploded_filtered, granularity = render_sidebar(df_master
 
 set_header_title("DASHBOARD ANALISIS IZAT PLN NP UP SEBALANG")
 
-near_miss_open = df_master_filtered[
-    (df_master_filtered['temuan_kategori'] == 'Near Miss') & 
-    (df_master_filtered['temuan_status'] == 'Open')
-]
+kpis = get_kpis(df_master_filtered)
 
-if not near_miss_open.empty:
-    count_nm = near_miss_open.shape[0]
-    st.error(f"PERINGATAN: Ada {count_nm} temuan 'Near Miss' berstatus OPEN yang memerlukan perhatian segera!")
+if kpis['near_miss_open']:
+    st.error(f"PERINGATAN: Ada {kpis['near_miss_open']} temuan 'Near Miss' berstatus OPEN yang memerlukan perhatian segera!")
 
-total_findings = len(df_master_filtered['kode_temuan'])
-
-if 'temuan_status' in df_master_filtered.columns:
-    status_lower = df_master_filtered['temuan_status'].astype(str).str.lower()
-    closed_findings = status_lower[status_lower == 'closed'].shape[0]
-    open_findings = status_lower[status_lower == 'open'].shape[0]
-    butuh_verifikasi = status_lower[status_lower == 'butuh verifikasi'].shape[0]
-else:
-    closed_findings = 0
-    open_findings = 0
-    butuh_verifikasi = 0
-if total_findings > 0:
-    closing_rate = ((closed_findings) / total_findings) * 100
-else:
-    closing_rate = 0.0
-
-pending_near_miss = df_master_filtered[
-    (df_master_filtered['temuan_kategori'] == 'Near Miss') & 
-    (df_master_filtered['temuan_status'] == 'Open')
-].shape[0]
+total_findings = kpis['total']
+open_findings = kpis['open']
+closed_findings = kpis['closed']
+butuh_verifikasi = kpis['butuh_verifikasi']
+closing_rate = kpis['closing_rate']
+pending_near_miss = kpis['near_miss_open']
 
 # st.write(df_master)
-c1, c2, c3, c4 = st.columns(4)
+c1, c2, c3, c4, c5 = st.columns(5)
 
 with c1:
     st.markdown(f"""
@@ -97,6 +82,17 @@ with c4:
         <h1 style="color: #FF4B4B;">{pending_near_miss}</h1>
     </div>
     """, unsafe_allow_html=True)
+
+with c5:
+    st.markdown(f"""
+    <div class="metric-card">
+        <h3>Waktu Penyelesaian (Median)</h3>
+        <h1>{format_duration(kpis['mttr_p50_hours'])}</h1>
+    </div>
+    """, unsafe_allow_html=True)
+    if kpis['resolved']:
+        st.caption(f"Rata-rata {format_duration(kpis['mttr_hours'])} · P90 {format_duration(kpis['mttr_p90_hours'])} "
+                   f"dari {kpis['resolved']} temuan closed")
 # --- 7. Charts (Row 1) ---
 col_left, col_right = st.columns([2, 1])
 
@@ -121,10 +117,9 @@ with col_left:
         if 'tanggal' in df_master_filtered.columns:
             if trend_mode == "Tren Total":
                 # Use period grouping instead of resample for better month alignment
-                df_temp = df_master_filtered.copy()
-                df_temp['Period'] = df_temp['tanggal'].dt.to_period(period_freq).dt.to_timestamp()
-                df_trend = df_temp.groupby('Period')['kode_temuan'].nunique().reset_index()
-                df_trend.rename(columns={'Period': 'tanggal'}, inplace=True)
+                # Gap-filled, so periods without findings show as 0 instead of being skipped
+                df_trend = period_matrix(df_master_filtered, period=period_freq).reset_index()
+                df_trend.rename(columns={'Period': 'tanggal', 'Total': 'kode_temuan'}, inplace=True)
                 
                 fig_trend = px.line(df_trend, x='tanggal', y='kode_temuan', markers=True, 
                                     color_discrete_sequence=['black'],
@@ -138,11 +133,11 @@ with col_left:
             else:
                 # Breakdown by Category
                 if 'temuan_kategori' in df_master_filtered.columns:
-                    # Create a period column for grouping
-                    df_temp = df_master_filtered.copy()
-                    df_temp['Period'] = df_temp['tanggal'].dt.to_period(period_freq).dt.to_timestamp()
-                    df_trend = df_temp.groupby(['Period', 'temuan_kategori'])['kode_temuan'].nunique().reset_index()
-                    df_trend.rename(columns={'Period': 'tanggal', 'kode_temuan': 'Count'}, inplace=True)
+                    # Distinct findings per period and category
+                    df_trend = (period_matrix(df_master_filtered, 'temuan_kategori', period=period_freq)
+                                .reset_index()
+                                .melt(id_vars='Period', var_name='temuan_kategori', value_name='Count'))
+                    df_trend.rename(columns={'Period': 'tanggal'}, inplace=True)
                     
                     # Use GLOBAL HSE_COLOR_MAP
                     
@@ -174,11 +169,10 @@ with col_right:
         st.subheader("Distribusi Risiko")
         st.caption("Rincian temuan berdasarkan Kategori Risiko.")
         if 'temuan_kategori' in df_master_filtered.columns:
-            kategori_clean = df_master_filtered['temuan_kategori'].dropna()
-            kategori_clean = kategori_clean[kategori_clean.astype(str).str.strip() != '']
-            kategori_clean = kategori_clean[kategori_clean.astype(str).str.lower() != 'none']
-            
-            df_risk = kategori_clean.value_counts().reset_index()
+            df_risk = aggregate(df_master_filtered, ['temuan_kategori'], measures=('Count',))
+            kategori = df_risk['temuan_kategori'].astype(str).str.strip()
+            df_risk = df_risk[(kategori != '') & (kategori.str.lower() != 'none') & (df_risk['Count'] > 0)]
+            df_risk = df_risk.sort_values('Count', ascending=False, kind='stable')
             df_risk.columns = ['Category', 'Count']
             fig_pie = px.pie(df_risk, values='Count', names='Category', 
                             color='Category', color_discrete_map=HSE_COLOR_MAP, hole=0.4,
@@ -206,7 +200,7 @@ if 'temuan_nama_spesifik' in df_exploded_filtered.columns and 'temuan_kategori'
 
     with col_bar:
         # Group by Object AND Category to show category context
-            top_objects = df_exploded_filtered.groupby(['temuan_nama_spesifik', 'temuan_kategori']).size().reset_index(name='Count')
+            top_objects = aggregate(df_exploded_filtered, ['temuan_nama_spesifik', 'temuan_kategori'], measures=('Count',))
             top_objects.columns = ['Object', 'Category', 'Count']
             object_totals = top_objects.groupby('Object')['Count'].sum().reset_index().sort_values('Count', ascending=False)
             sorted_objects = object_totals['Object'].tolist()
@@ -311,57 +305,30 @@ if 'temuan_nama_spesifik' in df_exploded_filtered.columns and 'temuan_kategori'
             label_visibility="collapsed"
         )
         if 'tanggal' in df_exploded_filtered.columns:
+            freq_alias = 'W' if granularity == 'Mingguan' else 'M'
+            # Period x object counts, gap-filled, in one pass
             if selected_trend_objects:
-                df_trend_filtered = df_exploded_filtered[df_exploded_filtered['temuan_nama_spesifik'].isin(selected_trend_objects)].copy()
+                df_bar_matrix = period_matrix(df_exploded_filtered, 'temuan_nama_spesifik', period=freq_alias,
+                                              values=selected_trend_objects, measure='Count')
             else:
-                df_trend_filtered = pd.DataFrame()
-            
-            if not df_trend_filtered.empty:
-                freq_alias = 'W' if granularity == 'Mingguan' else 'M'
-                
-                # Resample by Period and Object
-                df_trend_filtered['Period'] = pd.to_datetime(df_trend_filtered['tanggal']).dt.to_period(freq_alias).dt.to_timestamp()
-                
-                # Aggregate by Period and Object
-                df_bar_data = df_trend_filtered.groupby(['Period', 'temuan_nama_spesifik']).size().reset_index(name='Count')
-                
-                # Create complete date range to fill missing periods
-                min_period = df_bar_data['Period'].min()
-                max_period = df_bar_data['Period'].max()
-                if granularity == 'Mingguan':
-                    all_periods = pd.date_range(start=min_period, end=max_period, freq='W')
-                else:
-                    all_periods = pd.date_range(start=min_period, end=max_period, freq='MS')  # Month Start
-                
-                # Fill missing periods for each object with 0
-                df_bar_complete = []
-                for obj in selected_trend_objects:
-                    df_obj = df_bar_data[df_bar_data['temuan_nama_spesifik'] == obj]
-                    df_obj_complete = pd.DataFrame({'Period': all_periods})
-                    df_obj_complete = df_obj_complete.merge(df_obj, on='Period', how='left')
-                    df_obj_complete['temuan_nama_spesifik'] = obj
-                    df_obj_complete['Count'] = df_obj_complete['Count'].fillna(0).astype(int)
-                    df_bar_complete.append(df_obj_complete)
-                
-                df_bar_data = pd.concat(df_bar_complete, ignore_index=True)
-                
+                df_bar_matrix = pd.DataFrame()
+
+            if not df_bar_matrix.empty:
                 # Calculate total per period for line chart
-                df_total = df_bar_data.groupby('Period')['Count'].sum().reset_index()
-                df_total.columns = ['Period', 'Total']
+                df_total = df_bar_matrix.sum(axis=1).rename('Total').reset_index()
                 
                 # Create figure with bars and line
                 fig_combo = go.Figure()
                 
                 # Add stacked bars for each object
                 colors = px.colors.qualitative.Plotly
-                for idx, obj in enumerate(selected_trend_objects):
-                    df_obj = df_bar_data[df_bar_data['temuan_nama_spesifik'] == obj]
+                for idx, obj in enumerate(df_bar_matrix.columns):
                     fig_combo.add_trace(go.Bar(
-                        x=df_obj['Period'],
-                        y=df_obj['Count'],
+                        x=df_bar_matrix.index,
+                        y=df_bar_matrix[obj],
                         name=obj,
                         marker_color=colors[idx % len(colors)],
-                        text=df_obj['Count'],
+                        text=df_bar_matrix[obj],
                         textposition='inside',
                         textfont=dict(color='white', size=10),
                         hovertemplate='<b>%{fullData.name}</b><br>%{x|%d %b %Y}<br>Count: %{y}<extra></extra>'
@@ -468,19 +435,19 @@ with col_map:
             center_lat = -5.585357333271365
             center_lon = 105.38785245329919
             
-            map_key = f"map_home_{len(df_geo_home)}" 
+            tiles = tile_url()
             
-            if map_key not in st.session_state:
+            @instrument("homepage.map_build")
+            def build_home_map(df_geo_home):
                 m_home = folium.Map(location=[center_lat, center_lon], zoom_start=16)
-                api_key = st.secrets["api"]
                 folium.TileLayer(
-                    tiles=f"https://tiles.stadiamaps.com/tiles/alidade_satellite/{{z}}/{{x}}/{{y}}{{r}}.jpg?api_key={api_key['stadia']}",
+                    tiles=tiles,
                     attr='&copy; CNES, Distribution Airbus DS, &copy; Airbus DS, &copy; PlanetObserver | &copy; Stadia Maps',
                     name='Stadia Satellite'
                 ).add_to(m_home)
                 
-                heat_data = [[row['lat'], row['lon']] for index, row in df_geo_home.iterrows()]
-                HeatMap(heat_data, radius=12, blur=8).add_to(m_home)
+                # One weighted point per location instead of one point per finding
+                HeatMap(heat_data(location_weights(df_geo_home)), radius=12, blur=8).add_to(m_home)
                 
                 # --- Custom Legend for Heatmap ---
                 legend_html = '''
@@ -503,9 +470,13 @@ with col_map:
                 macro._template = Template(legend_html)
                 m_home.get_root().add_child(macro)
                 
-                st.session_state[map_key] = m_home
+                return m_home
             
-            st_folium(st.session_state[map_key], height=280, width="100%", returned_objects=[])
+            # Rendered once per filter and shared by every session (see geo.cached_map_html)
+            map_html = cached_map_html("home", df_master_filtered, ['lat', 'lon'],
+                                       lambda: build_home_map(df_geo_home), tiles=tiles)
+            with timed("homepage.map_render"):
+                components.html(map_html, height=280)
         else:
             st.info("Data spasial tidak tersedia untuk heatmap.")
     else:
@@ -0,0 +1,242 @@
+"""
+Aggregation layer for the dashboard charts.
+
+Charts ask for "distinct findings per <columns> (per period)" through
+aggregate() instead of grouping raw rows themselves, so the work can run
+where it is cheapest. `[engine] backend` selects the backend:
+
+- "pandas" (default): re-sum the shared dataset's daily rollup cube
+  (cube.py) under the sidebar FilterState, or group the already-filtered
+  frame in-process when it is not the sidebar's view; results are cached
+  per filter signature in the view cache.
+- "warehouse": compile the sidebar FilterState and grouping spec into a
+  parameterized GROUP BY against Postgres; results are cached per filter
+  signature, so containers don't need the full fact table for charts.
+- "duckdb": run the same GROUP BY over the in-process DuckDB copy of the
+  shared dataset (see query_engine.py).
+"""
+from datetime import timedelta
+
+import pandas as pd
+import streamlit as st
+
+from perf import instrument
+from query_engine import DUCKDB_TABLE, date_bounds, get_duckdb_connection
+from utils import (
+    current_dataset, db_connection, get_config, get_data_status, get_filter_state, period_start,
+    resolve_findings_source, sidebar_view_key, view_cache,
+)
+
+# Measures understood by every backend.
+MEASURES = ('Total', 'Count', 'Closed', 'Open')
+
+# Columns the warehouse backend may group or filter on (guards the SQL it builds).
+GROUPABLE_COLUMNS = {
+    'temuan_kategori', 'temuan_status', 'temuan_nama_spesifik', 'nama_lokasi', 'zona',
+    'creator_departemen', 'creator_role', 'creator_name', 'pic_departemen',
+}
+
+PERIOD_TRUNC = {'M': 'month', 'W': 'week'}
+# date_range frequency of the bucket starts produced by period_start / date_trunc.
+PERIOD_FREQ = {'M': 'MS', 'W': 'W-MON'}
+
+
+def get_backend():
+    return get_config("engine", "backend", "pandas")
+
+
+@instrument("aggregate")
+def aggregate(df_filtered, group_by=(), period=None, measures=('Total',)):
+    """
+    Aggregates findings per `group_by` columns and, when `period` is 'M' or
+    'W', per month/week bucket of `tanggal` (column 'Period', bucket start).
+
+    Measures: 'Total' distinct kode_temuan, 'Count' rows, 'Closed'/'Open' rows
+    with that status. Returns a flat DataFrame of keys + measures.
+    `df_filtered` must be the sidebar-filtered frame; the warehouse backend
+    re-applies the same FilterState server-side instead of reading it.
+    """
+    group_by, measures = tuple(group_by), tuple(measures)
+    unknown = set(measures) - set(MEASURES)
+    if unknown:
+        raise ValueError(f"Unknown measures: {sorted(unknown)}")
+
+    state = get_filter_state()
+    backend = get_backend()
+    if backend == "warehouse" and state is not None:
+        return _warehouse_aggregate(state, group_by, period, measures, get_data_status()["version"])
+    dataset = current_dataset()
+    if backend == "duckdb" and state is not None and dataset is not None:
+        return _duckdb_aggregate(dataset, state, group_by, period, measures)
+
+    view_key = sidebar_view_key(df_filtered)
+    cube = dataset.cube if dataset is not None and view_key is not None else None
+    # The view must come from the dataset the cube was built on (a refresh may land mid-rerun).
+    if cube is not None and state is not None and view_key[0][0] == dataset.version \
+            and set(group_by) <= set(cube.columns):
+        return view_cache().get_or_compute(
+            (view_key, "aggregate", group_by, period, measures),
+            lambda: _cube_aggregate(dataset, state, group_by, period, measures),
+        )
+    return _pandas_aggregate(df_filtered, group_by, period, measures)
+
+
+def period_matrix(df_filtered, column=None, period='M', values=None, measure='Total'):
+    """
+    `measure` per period bucket (rows, index 'Period') and value of `column`
+    (columns) as a dense matrix: one aggregate() call, one pivot and one
+    reindex onto every bucket between the first and last non-empty one, with
+    missing cells 0. Without `column` the single column is named `measure`.
+    `values` picks and orders the columns; values without findings become
+    all-zero columns.
+    """
+    agg = aggregate(df_filtered, [column] if column else [], period=period, measures=(measure,))
+    if column:
+        matrix = agg.pivot_table(index='Period', columns=column, values=measure, aggfunc='sum',
+                                 fill_value=0, observed=True)
+        matrix.columns = matrix.columns.astype(str)
+        if values is not None:
+            matrix = matrix.reindex(columns=[str(v) for v in values], fill_value=0)
+    else:
+        matrix = agg.set_index('Period')[[measure]]
+
+    active = matrix.index[matrix.to_numpy().any(axis=1)] if len(matrix.columns) else matrix.index[:0]
+    if active.empty:
+        return pd.DataFrame(columns=matrix.columns, index=pd.DatetimeIndex([], name='Period'), dtype='int64')
+    periods = pd.date_range(active.min(), active.max(), freq=PERIOD_FREQ[period], name='Period')
+    matrix = matrix.reindex(periods, fill_value=0).astype('int64')
+    matrix.columns.name = column
+    return matrix
+
+
+def _empty_result(source, keys, measures):
+    """A zero-row aggregate: key columns typed like `source`'s, int64 measures, as a groupby would give."""
+    columns = {k: pd.Series(dtype=source[k].dtype) for k in keys}
+    columns.update({m: pd.Series(dtype='int64') for m in measures})
+    return pd.DataFrame(columns)
+
+
+def _pandas_aggregate(df, group_by, period, measures):
+    keys = list(group_by)
+    if period:
+        df = df.assign(Period=period_start(df, period))
+        keys = ['Period'] + keys
+    if df.empty:
+        return _empty_result(df, keys, measures)
+
+    status = df['temuan_status'].astype(str).str.lower() if {'Closed', 'Open'} & set(measures) else None
+    if 'Closed' in measures:
+        df = df.assign(_closed=(status == 'closed'))
+    if 'Open' in measures:
+        df = df.assign(_open=(status == 'open'))
+
+    specs = {
+        'Total': ('kode_temuan', 'nunique'),
+        'Count': ('kode_temuan', 'size'),
+        'Closed': ('_closed', 'sum'),
+        'Open': ('_open', 'sum'),
+    }
+    return df.groupby(keys, observed=True).agg(**{m: specs[m] for m in measures}).reset_index()
+
+
+def _cube_aggregate(dataset, state, group_by, period, measures):
+    """Same result as _pandas_aggregate over the FilterState's findings, summed from the rollup cube."""
+    cube = dataset.cube
+    lo, hi = date_bounds(dataset.cube_time_index, state.start_date, state.end_date)
+    keys = list(group_by)
+    view = cube[['tanggal', *keys, 'Count', 'temuan_status']].iloc[lo:hi]
+
+    mask = None
+    for column, values in (('temuan_kategori', state.categories), ('temuan_status', state.statuses),
+                           ('nama_lokasi', state.locations),
+                           ('creator_departemen', (state.department,) if state.department else ())):
+        if values:
+            selected = cube[column].iloc[lo:hi].isin(values).to_numpy()
+            mask = selected if mask is None else mask & selected
+    if mask is not None:
+        view = view[mask]
+
+    if period:
+        view = view.assign(Period=period_start(view, period))
+        keys = ['Period'] + keys
+    if view.empty:
+        return _empty_result(view, keys, measures)
+
+    counts = view['Count']
+    sums = {'Total': counts, 'Count': counts}
+    if 'Closed' in measures:
+        sums['Closed'] = counts.where(view['temuan_status'] == 'Closed', 0)
+    if 'Open' in measures:
+        sums['Open'] = counts.where(view['temuan_status'] == 'Open', 0)
+    summed = pd.DataFrame({**{k: view[k] for k in keys}, **{m: sums[m] for m in measures}})
+    return summed.groupby(keys, observed=True)[list(measures)].sum().reset_index()
+
+
+def compile_aggregate_sql(source_query, state, group_by, period, measures, paramstyle="pyformat"):
+    """
+    Builds the parameterized GROUP BY query for a FilterState and grouping spec.
+    `paramstyle` is "pyformat" (psycopg2, %(name)s) or "duckdb" ($name).
+    """
+    def p(name):
+        return f"${name}" if paramstyle == "duckdb" else f"%({name})s"
+
+    bad = set(group_by) - GROUPABLE_COLUMNS
+    if bad:
+        raise ValueError(f"Cannot group by {sorted(bad)}")
+
+    select, keys = [], []
+    if period:
+        select.append(f"date_trunc('{PERIOD_TRUNC[period]}', f.tanggal) AS \"Period\"")
+        keys.append('"Period"')
+    for col in group_by:
+        select.append(f"f.{col}")
+        keys.append(f"f.{col}")
+
+    measure_sql = {
+        'Total': 'COUNT(DISTINCT f.kode_temuan)',
+        'Count': 'COUNT(*)',
+        'Closed': "COUNT(*) FILTER (WHERE LOWER(TRIM(f.temuan_status)) = 'closed')",
+        'Open': "COUNT(*) FILTER (WHERE LOWER(TRIM(f.temuan_status)) = 'open')",
+    }
+    select += [f'{measure_sql[m]} AS "{m}"' for m in measures]
+
+    where = [f"f.tanggal >= {p('start')}", f"f.tanggal < {p('end')}"]
+    params = {"start": state.start_date, "end": state.end_date + timedelta(days=1)}
+    if state.categories:
+        where.append(f"f.temuan_kategori = ANY({p('categories')})")
+        params["categories"] = list(state.categories)
+    if state.statuses:
+        # Status values are canonicalised client-side, so compare case-insensitively.
+        where.append(f"LOWER(TRIM(f.temuan_status)) = ANY({p('statuses')})")
+        params["statuses"] = [s.lower() for s in state.statuses]
+    if state.locations:
+        where.append(f"f.nama_lokasi = ANY({p('locations')})")
+        params["locations"] = list(state.locations)
+    if state.department:
+        where.append(f"f.creator_departemen = {p('department')}")
+        params["department"] = state.department
+
+    sql = f"SELECT {', '.join(select)}\nFROM ({source_query}) f\nWHERE {' AND '.join(where)}"
+    if keys:
+        sql += f"\nGROUP BY {', '.join(keys)}"
+    return sql, params
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _warehouse_aggregate(state, group_by, period, measures, dataset_version):
+    # dataset_version only keys the cache, so results roll over with the shared dataset.
+    with db_connection() as conn:
+        raw_conn = conn.connection
+        _, source_query, _ = resolve_findings_source(raw_conn)
+        sql, params = compile_aggregate_sql(source_query, state, group_by, period, measures)
+        df = pd.read_sql(sql, raw_conn, params=params)
+    if 'Period' in df.columns:
+        df['Period'] = pd.to_datetime(df['Period'])
+    return df
+
+
+def _duckdb_aggregate(dataset, state, group_by, period, measures):
+    con = get_duckdb_connection(dataset.master, dataset.version)
+    sql, params = compile_aggregate_sql(f"SELECT * FROM {DUCKDB_TABLE}", state, group_by, period, measures,
+                                        paramstyle="duckdb")
+    return con.cursor().execute(sql, params).df()
@@ -0,0 +1,270 @@
+"""
+Scaling benchmark for the dashboard's data path.
+
+For each size, synthetic findings (synthetic.py) are loaded into a SQLite or
+scratch Postgres stand-in. The benchmark then times the same calls the pages
+make: the findings load, render_sidebar, filter_by_date, a sidebar selection
+(cold and from the view cache), compute_kpis and each page's aggregations.
+The report is JSON, with one record per (size, stage), so two runs can be
+compared with compare_reports().
+
+    python cli.py bench --sizes 10000 100000 1000000 --output bench.json
+    python cli.py bench --baseline bench.json        # exits 1 on regressions
+
+Streamlit calls run in "bare" mode (no browser session), so widgets return
+their defaults. Aggregations use the configured `[engine] backend`.
+"""
+import logging
+import os
+import platform
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import synthetic
+from analytics import aggregate, get_backend, period_matrix
+from constants import HSE_COLOR_MAP
+from geo import heat_data, location_markers, location_weights, zone_aggregates
+from kpi import compute_kpis
+from utils import (
+    FINDINGS_QUERY, SIDEBAR_FACETS, FilterState, _coerce_chunk, _current_rss_mb, _findings_store, _publish_findings,
+    _read_findings, facet_filter, filter_by_date, normalize_findings, render_sidebar, view_cache,
+)
+
+logger = logging.getLogger(__name__)
+
+REPORT_VERSION = 1
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+DEFAULT_WORKDIR = os.path.join(".cache", "bench")
+
+
+# --- Page aggregations, as the pages compute them ---
+def _homepage(df):
+    period_matrix(df, period='M')
+    period_matrix(df, 'temuan_kategori', period='M')
+    aggregate(df, ['temuan_kategori'], measures=('Count',))
+    aggregate(df, ['temuan_nama_spesifik', 'temuan_kategori'], measures=('Count',))
+
+
+def _peta(df):
+    heat_data(location_weights(df))
+    location_weights(df, by='temuan_kategori')
+    location_markers(df, list(HSE_COLOR_MAP))
+    zone_aggregates(df, list(HSE_COLOR_MAP))
+    aggregate(df, ['nama_lokasi']).sort_values('Total', ascending=False).head(20)
+    df[df['lat'] == 0].groupby('nama_lokasi', observed=True)['kode_temuan'].nunique()
+
+
+def _departemen(df):
+    df[df['temuan_status'] == 'Open']['creator_name'].value_counts()
+    aggregate(df, ['creator_departemen'], measures=('Total', 'Closed'))
+    aggregate(df, ['creator_departemen', 'temuan_kategori'], measures=('Count',))
+    df.groupby('creator_name').agg({
+        'kode_temuan': 'count',
+        'temuan_status': lambda x: (x == 'Open').sum(),
+        'creator_role': 'first',
+        'creator_departemen': 'first',
+    })
+
+
+PAGE_AGGREGATIONS = {
+    'Homepage': _homepage,
+    '03_Peta': _peta,
+    '04_Departemen_dan_Personil': _departemen,
+}
+
+
+def _timed(fn, repeat):
+    """Runs fn `repeat` times; returns (last result, list of seconds)."""
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, timings
+
+
+def _record(size, stage, timings, rows=None, error=None):
+    rec = {"size": size, "stage": stage, "runs": len(timings), "rows": rows,
+           "rss_mb": round(_current_rss_mb(), 1)}
+    if timings:
+        rec.update(min_s=round(min(timings), 6), median_s=round(statistics.median(timings), 6),
+                   max_s=round(max(timings), 6))
+    if error is not None:
+        rec["error"] = error
+    return rec
+
+
+def _prepare(size, target, seed, workdir, dsn):
+    """Makes sure the stand-in holds `size` findings. Returns (location, seconds spent seeding)."""
+    if target == "sqlite":
+        path = os.path.join(workdir, f"star_{size}_{seed}.sqlite")
+        if os.path.exists(path):
+            return path, 0.0
+        os.makedirs(workdir, exist_ok=True)
+        start = time.perf_counter()
+        synthetic.load_sqlite(synthetic.generate_star_schema(size, seed=seed), path + ".tmp")
+        os.replace(path + ".tmp", path)
+        return path, time.perf_counter() - start
+
+    from sqlalchemy import create_engine
+    engine = create_engine(dsn)
+    start = time.perf_counter()
+    synthetic.load_postgres(synthetic.generate_star_schema(size, seed=seed), engine)
+    return engine, time.perf_counter() - start
+
+
+def _load(target, location):
+    """The cold-start load: findings query, normalization and publishing the shared dataset."""
+    if target == "sqlite":
+        con = synthetic.connect_sqlite(location)
+        try:
+            df = _coerce_chunk(pd.read_sql(FINDINGS_QUERY, con))
+        finally:
+            con.close()
+    else:
+        raw_conn = location.raw_connection()
+        try:
+            df = _read_findings(raw_conn, FINDINGS_QUERY)
+        finally:
+            raw_conn.close()
+    df, memory_report = normalize_findings(df)
+    store = _findings_store()
+    _publish_findings(store, df, fingerprint=(str(len(df)), "benchmark", target), source=target,
+                      memory_report=memory_report, origin="benchmark", loaded_at=datetime.now(), error=None)
+    return store["dataset"]
+
+
+def _typical_selection(df):
+    """A typical narrowed view: the busiest category, open findings, top five locations, last 180 days."""
+    end = df['tanggal'].max().date()
+    return FilterState(
+        start_date=end - timedelta(days=180),
+        end_date=end,
+        categories=(str(df['temuan_kategori'].value_counts().index[0]),),
+        statuses=('Open',),
+        locations=tuple(str(v) for v in df['nama_lokasi'].value_counts().index[:5]),
+    )
+
+
+def _apply_selection(dataset, state, cold=False):
+    """Filters the way render_sidebar does for `state`, with the configured engine."""
+    if cold:
+        view_cache().clear()
+    facets = facet_filter(dataset, dataset.master, state.start_date, state.end_date)
+    for column, values in (('temuan_kategori', state.categories), ('temuan_status', state.statuses),
+                           ('nama_lokasi', state.locations)):
+        if values:
+            facets.isin(column, values)
+    facets.facet_counts([column for column, _, _ in SIDEBAR_FACETS])
+    return facets.result()
+
+
+def _run_size(size, target, seed, repeat, workdir, dsn):
+    location, seed_s = _prepare(size, target, seed, workdir, dsn)
+    records = []
+    if seed_s:
+        records.append(_record(size, "seed", [seed_s], rows=size))
+
+    dataset, timings = _timed(lambda: _load(target, location), 1)
+    df = dataset.master
+    records.append(_record(size, "load_data", timings, rows=len(df)))
+
+    # Whole date range, nothing selected: what every page pays on first render.
+    st.session_state.pop('filter_state', None)
+    (view, _, _), timings = _timed(lambda: render_sidebar(df, df), repeat)
+    records.append(_record(size, "render_sidebar", timings, rows=len(df)))
+
+    cube, timings = _timed(lambda: dataset.cube, 1)
+    records.append(_record(size, "cube_build", timings, rows=None if cube is None else len(cube)))
+
+    end = df['tanggal'].max().date()
+    result, timings = _timed(lambda: filter_by_date(df, end - timedelta(days=90), end), repeat)
+    records.append(_record(size, "filter_by_date", timings, rows=len(result)))
+
+    state = _typical_selection(df)
+    filtered, timings = _timed(lambda: _apply_selection(dataset, state, cold=True), repeat)
+    records.append(_record(size, "sidebar_selection", timings, rows=len(filtered)))
+    # Same selection again: served from the filtered-view cache.
+    filtered, timings = _timed(lambda: _apply_selection(dataset, state), repeat)
+    records.append(_record(size, "sidebar_selection_cached", timings, rows=len(filtered)))
+
+    _, timings = _timed(lambda: compute_kpis(df), repeat)
+    records.append(_record(size, "compute_kpis", timings, rows=len(df)))
+
+    # Pages aggregate the sidebar's unfiltered view, as in the app (rollup cube on the pandas
+    # backend). The view cache is cleared each run so repeats don't just measure cache hits.
+    for page, fn in PAGE_AGGREGATIONS.items():
+        try:
+            _, timings = _timed(lambda: (view_cache().clear(), fn(view)), repeat)
+            records.append(_record(size, f"page:{page}", timings, rows=len(df)))
+        except Exception as e:
+            logger.warning("Page aggregation %s failed at %d rows: %s", page, size, e)
+            records.append(_record(size, f"page:{page}", [], error=str(e)))
+    return records
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, target="sqlite", dsn=None, repeat=3, seed=0, workdir=DEFAULT_WORKDIR):
+    """Runs every stage at every size and returns the report as a dict."""
+    if target not in ("sqlite", "postgres"):
+        raise ValueError(f"Unknown benchmark target: {target}")
+    if target == "postgres" and not dsn:
+        raise ValueError("The postgres target needs a DSN of a scratch database")
+
+    results = []
+    for size in sizes:
+        logger.info("Benchmarking %d findings on %s", size, target)
+        results.extend(_run_size(int(size), target, seed, repeat, workdir, dsn))
+    return {
+        "version": REPORT_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "target": target,
+        "engine": get_backend(),
+        "repeat": repeat,
+        "seed": seed,
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "streamlit": st.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare_reports(baseline, report, tolerance=0.25, min_seconds=0.005):
+    """
+    Stages whose median got more than `tolerance` slower than in `baseline`.
+    Stages faster than `min_seconds` in both runs are noise and skipped.
+    """
+    before = {(r["size"], r["stage"]): r for r in baseline["results"] if "median_s" in r}
+    regressions = []
+    for rec in report["results"]:
+        old = before.get((rec["size"], rec["stage"]))
+        if old is None or "median_s" not in rec or rec["stage"] == "seed":
+            continue
+        if max(old["median_s"], rec["median_s"]) < min_seconds:
+            continue
+        ratio = rec["median_s"] / old["median_s"] if old["median_s"] else float("inf")
+        if ratio > 1 + tolerance:
+            regressions.append({"size": rec["size"], "stage": rec["stage"], "baseline_s": old["median_s"],
+                                "current_s": rec["median_s"], "ratio": round(ratio, 2)})
+    return regressions
+
+
+def format_report(report):
+    """Plain-text table of a report for the terminal."""
+    lines = [f"{'size':>9}  {'stage':<34} {'median s':>10} {'min s':>10} {'rows':>9} {'rss MiB':>8}"]
+    for r in report["results"]:
+        if "error" in r:
+            lines.append(f"{r['size']:>9}  {r['stage']:<34} ERROR {r['error']}")
+            continue
+        lines.append(f"{r['size']:>9}  {r['stage']:<34} {r['median_s']:>10.4f} {r['min_s']:>10.4f} "
+                     f"{r['rows'] if r['rows'] is not None else '':>9} {r['rss_mb']:>8}")
+    return "\n".join(lines)
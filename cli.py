@@ -0,0 +1,212 @@
+"""
+Maintenance commands for the dashboard's warehouse objects.
+
+    python cli.py migrate   # apply pending SQL files from migrations/
+    python cli.py refresh   # refresh the flat findings table after an ETL run
+    python cli.py explain   # EXPLAIN ANALYZE the load query and its joins, store the plans
+    python cli.py seed      # load synthetic findings into a SQLite/Postgres stand-in
+    python cli.py bench     # time the data path at several sizes (see benchmark.py)
+    python cli.py tiles serve|seed   # satellite tile caching proxy (see tile_proxy.py)
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+
+from utils import db_connection, get_config, get_db_engine, refresh_flat_table
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+
+def migrate(engine):
+    """Applies every migrations/*.sql file not yet recorded in public.dashboard_migrations."""
+    with db_connection(engine) as conn, conn.begin():
+        raw_conn = conn.connection
+        cur = raw_conn.cursor()
+        cur.execute(
+            "CREATE TABLE IF NOT EXISTS public.dashboard_migrations ("
+            "name text PRIMARY KEY, applied_at timestamptz NOT NULL DEFAULT now())"
+        )
+        cur.execute("SELECT name FROM public.dashboard_migrations")
+        applied = {row[0] for row in cur.fetchall()}
+
+        for path in sorted(glob.glob(os.path.join(MIGRATIONS_DIR, "*.sql"))):
+            name = os.path.basename(path)
+            if name in applied:
+                continue
+            print(f"Applying {name}")
+            with open(path) as f:
+                cur.execute(f.read())
+            cur.execute("INSERT INTO public.dashboard_migrations (name) VALUES (%s)", (name,))
+        cur.close()
+
+
+def explain(engine, store=True):
+    """Prints the plan diagnostics of the load query and each dimension join."""
+    import query_plans
+
+    results, stored = query_plans.run_diagnostics(engine, store=store)
+    for r in results:
+        if "error" in r:
+            print(f"{r['query_name']:<26} FAILED: {r['error']}")
+            continue
+        print(f"{r['query_name']:<26} {r['execution_ms']:>10.1f} ms  {r['actual_rows']:>9} rows")
+        for flag in r["flags"]:
+            print(f"    [{flag['severity']}] {flag['detail']}")
+    if stored:
+        print(f"Plans stored in {query_plans.PLANS_TABLE} (run {results[0]['run_id']})")
+    elif store:
+        print(f"{query_plans.PLANS_TABLE} does not exist, plans not stored; run `python cli.py migrate`")
+
+
+def seed(args):
+    """Generates synthetic findings and loads them into the chosen stand-in."""
+    import synthetic
+
+    tables = synthetic.generate_star_schema(args.rows, seed=args.seed)
+    if args.dsn:
+        from sqlalchemy import create_engine
+        synthetic.load_postgres(tables, create_engine(args.dsn))
+        print(f"Loaded {args.rows} synthetic findings into {args.dsn.rsplit('@', 1)[-1]}")
+    else:
+        synthetic.load_sqlite(tables, args.sqlite)
+        print(f"Loaded {args.rows} synthetic findings into {args.sqlite}")
+    return 0
+
+
+def bench(args):
+    """Runs the benchmark, writes the JSON report and compares it with a baseline."""
+    import benchmark
+
+    # Streamlit warns on every call made outside `streamlit run`, and the
+    # per-stage perf lines would duplicate the report.
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit") or name == "perf":
+            logging.getLogger(name).disabled = True
+    # Pages load styles.css and assets relative to the app directory.
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    report = benchmark.run_benchmark(
+        sizes=args.sizes, target="postgres" if args.dsn else "sqlite", dsn=args.dsn,
+        repeat=args.repeat, seed=args.seed,
+    )
+    print(benchmark.format_report(report))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = benchmark.compare_reports(json.load(f), report, tolerance=args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['stage']} at {r['size']} rows: "
+                  f"{r['baseline_s']:.4f}s -> {r['current_s']:.4f}s ({r['ratio']}x)", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+def tiles(args):
+    """Runs the tile proxy, or pre-fetches the plant's tiles into its cache."""
+    import tile_proxy
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    center = (args.lat if args.lat is not None else float(get_config("tiles", "center_lat", tile_proxy.PLANT_CENTER[0])),
+              args.lon if args.lon is not None else float(get_config("tiles", "center_lon", tile_proxy.PLANT_CENTER[1])))
+    radius_m = args.radius_m
+    if radius_m is None:
+        radius_m = float(get_config("tiles", "radius_m", tile_proxy.DEFAULT_RADIUS_M))
+    zoom = args.zoom or (int(get_config("tiles", "min_zoom", tile_proxy.SEED_ZOOMS.start)),
+                         int(get_config("tiles", "max_zoom", tile_proxy.SEED_ZOOMS.stop - 1)))
+    area = (center, radius_m, range(zoom[0], zoom[1] + 1))
+    cache = tile_proxy.TileCache(
+        upstream=args.upstream or get_config("tiles", "upstream", tile_proxy.DEFAULT_UPSTREAM),
+        api_key=get_config("api", "stadia", ""),
+        cache_dir=args.cache_dir or get_config("tiles", "cache_dir", tile_proxy.DEFAULT_CACHE_DIR),
+        # The served proxy only fetches the plant footprint; anything else is cache-only.
+        footprint=tile_proxy.footprint(*area) if args.action == "serve" else None,
+    )
+    if args.action == "seed":
+        cached, fetched, failed = tile_proxy.seed(cache, tile_proxy.tiles_around(*area),
+                                                  retina=args.retina, workers=args.workers)
+        print(f"{cached} tiles already cached, {fetched} fetched, {failed} failed ({cache.cache_dir})")
+        return 1 if failed else 0
+
+    port = args.port or int(get_config("tiles", "port", tile_proxy.DEFAULT_PORT))
+    server = tile_proxy.make_server(cache, args.host, port)
+    print(f"Serving tiles from {cache.cache_dir} on http://{args.host}:{port}/tiles/{{z}}/{{x}}/{{y}}{{r}}.jpg")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("migrate", help="apply pending warehouse migrations")
+    sub.add_parser("refresh", help="refresh the flat findings table")
+    p_explain = sub.add_parser("explain", help="EXPLAIN ANALYZE the load query and each dimension join")
+    p_explain.add_argument("--no-store", action="store_true", help="print only, don't save the plans")
+
+    p_seed = sub.add_parser("seed", help="load synthetic findings into a stand-in database")
+    p_seed.add_argument("--rows", type=int, default=100_000)
+    p_seed.add_argument("--seed", type=int, default=0)
+    p_seed.add_argument("--sqlite", default=os.path.join(".cache", "bench", "star.sqlite"),
+                        help="SQLite file to write (default: %(default)s)")
+    p_seed.add_argument("--dsn", help="scratch Postgres database URL instead of SQLite; its public tables are replaced")
+
+    p_bench = sub.add_parser("bench", help="benchmark the data path at several dataset sizes")
+    p_bench.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    p_bench.add_argument("--repeat", type=int, default=3)
+    p_bench.add_argument("--seed", type=int, default=0)
+    p_bench.add_argument("--dsn", help="scratch Postgres database URL instead of SQLite; its public tables are replaced")
+    p_bench.add_argument("--output", default="bench-report.json")
+    p_bench.add_argument("--baseline", help="earlier report to compare against")
+    p_bench.add_argument("--tolerance", type=float, default=0.25,
+                         help="allowed slowdown vs. the baseline median (default: %(default)s)")
+
+    p_tiles = sub.add_parser("tiles", help="run the satellite tile caching proxy, or seed its cache")
+    p_tiles.add_argument("action", choices=("serve", "seed"))
+    p_tiles.add_argument("--upstream", help="tile URL template to fetch misses from (default: [tiles] upstream)")
+    p_tiles.add_argument("--cache-dir", help="tile cache directory (default: [tiles] cache_dir)")
+    p_tiles.add_argument("--host", default="0.0.0.0")
+    p_tiles.add_argument("--port", type=int, help="proxy port (default: [tiles] port, 8601)")
+    p_tiles.add_argument("--zoom", type=int, nargs=2, metavar=("MIN", "MAX"),
+                         help="zoom levels seeded / fetched from upstream (default: [tiles] min_zoom max_zoom, 15 19)")
+    p_tiles.add_argument("--radius-m", type=float, help="area around the center (default: [tiles] radius_m, 1500)")
+    p_tiles.add_argument("--lat", type=float, help="area center latitude (default: [tiles] center_lat, the plant)")
+    p_tiles.add_argument("--lon", type=float, help="area center longitude (default: [tiles] center_lon, the plant)")
+    p_tiles.add_argument("--retina", action="store_true", help="seed the @2x tiles instead")
+    p_tiles.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    if args.command == "seed":
+        os.makedirs(os.path.dirname(args.sqlite) or ".", exist_ok=True)
+        return seed(args)
+    if args.command == "bench":
+        return bench(args)
+    if args.command == "tiles":
+        return tiles(args)
+
+    try:
+        engine = get_db_engine()
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if args.command == "migrate":
+        migrate(engine)
+    elif args.command == "refresh":
+        refresh_flat_table(engine)
+    elif args.command == "explain":
+        explain(engine, store=not args.no_store)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Geo aggregation for the map views.
+
+Coordinates come from dim_tempat, so thousands of findings share a few dozen
+distinct points. The maps are fed per-coordinate aggregates built in one
+groupby instead of one entry per finding, which keeps both the Python build
+time and the HTML sent to the browser proportional to the number of
+locations.
+
+Findings at (0, 0) have no real location (the pages list them separately)
+and are left out of every aggregate here.
+
+Zone-level aggregates (zone_aggregates) are computed once per filter state
+and joined onto a local GeoJSON of the plant zones (zone_features) for the
+choropleth layer.
+
+Built maps are shared across sessions as rendered HTML through
+cached_map_html(), keyed on what the map shows rather than on the session.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from analytics import aggregate
+from utils import map_cache, sidebar_view_key, view_cache
+
+
+def located(df, columns=()):
+    """`lat`, `lon` and `columns` of the findings in `df` that have a real coordinate."""
+    geo = df[['lat', 'lon', *columns]].dropna(subset=['lat', 'lon'])
+    return geo[(geo['lat'] != 0) | (geo['lon'] != 0)]
+
+
+def location_weights(df, by=None):
+    """
+    Findings per coordinate (and per value of `by`, if given) in column
+    'weight'. The master frame holds one row per finding, so this is the
+    number of distinct findings at each point.
+    """
+    keys = ['lat', 'lon', *([by] if by else [])]
+    return (located(df, keys[2:])
+            .groupby(keys, observed=True, sort=False)
+            .size().reset_index(name='weight'))
+
+
+def heat_data(points):
+    """
+    `[lat, lon, weight]` triples for folium's HeatMap from location_weights().
+    Weights are scaled to (0, 1] against the busiest point: Leaflet.heat
+    clips intensities at 1, so raw counts would saturate every point.
+    """
+    if points.empty:
+        return []
+    weights = points['weight'].to_numpy(dtype=float)
+    triples = np.column_stack([
+        points['lat'].to_numpy(dtype=float), points['lon'].to_numpy(dtype=float), weights / weights.max(),
+    ])
+    return triples.tolist()
+
+
+# Finding fields carried in a location marker's popup, in payload order.
+DETAIL_COLUMNS = (
+    'kode_temuan', 'temuan_kategori', 'temuan_status', 'raw_judul', 'temuan_nama',
+    'raw_kondisi', 'raw_rekomendasi', 'open_at',
+)
+
+
+def _detail_strings(column):
+    """`column` as display strings, '-' for missing values."""
+    if pd.api.types.is_datetime64_any_dtype(column):
+        # numpy formats an order of magnitude faster than Series.dt.strftime.
+        stamps = np.datetime_as_string(column.dt.tz_localize(None) if column.dt.tz else column, unit='m')
+        return pd.Series(np.char.replace(stamps, 'T', ' '), index=column.index).where(column.notna(), '-')
+    return column.astype(object).where(column.notna(), '-').astype(str)
+
+
+def location_markers(df, categories, max_details=50):
+    """
+    One marker row per coordinate: `[lat, lon, info]` where info holds the
+    location name ('n'), the number of findings ('t'), their count per entry
+    of `categories` plus a trailing count for any other category ('c'), and
+    the DETAIL_COLUMNS of at most `max_details` of its most recent findings
+    as plain arrays ('f', '-' for missing values). The page renders popups from 'f' when a marker is
+    opened instead of shipping one HTML popup per finding.
+    """
+    details = [c for c in DETAIL_COLUMNS if c in df.columns]
+    geo = located(df, [*details, *(c for c in ('nama_lokasi', 'tanggal') if c in df.columns)])
+    if geo.empty:
+        return []
+    geo = geo.assign(_loc=geo.groupby(['lat', 'lon'], sort=False).ngroup())
+    loc = geo['_loc'].to_numpy()
+    n_locations = int(loc.max()) + 1
+
+    counts = np.zeros((n_locations, len(categories) + 1), dtype=np.int64)
+    if 'temuan_kategori' in geo.columns:
+        category = pd.Categorical(geo['temuan_kategori'].astype(object), categories=list(categories)).codes
+    else:
+        category = np.full(len(geo), -1)
+    # Unknown categories (code -1) land in the trailing "other" column.
+    np.add.at(counts, (loc, np.where(category < 0, len(categories), category)), 1)
+
+    # Newest first within each location, then keep the first max_details.
+    by = ['_loc', 'tanggal'] if 'tanggal' in geo.columns else ['_loc']
+    ordered = geo.sort_values(by, ascending=[True, False][:len(by)], kind='stable')
+    ordered = ordered[ordered.groupby('_loc', sort=False).cumcount().to_numpy() < max_details]
+    # Missing columns stay in the payload as '-' so field positions are fixed.
+    values = np.column_stack([
+        _detail_strings(ordered[c]).to_numpy() if c in details else np.full(len(ordered), '-', dtype=object)
+        for c in DETAIL_COLUMNS
+    ])
+    bounds = np.searchsorted(ordered['_loc'].to_numpy(), np.arange(n_locations + 1))
+
+    heads = geo.drop_duplicates('_loc').sort_values('_loc')
+    names = _detail_strings(heads['nama_lokasi']).tolist() if 'nama_lokasi' in heads.columns else ['-'] * n_locations
+    return [
+        [lat, lon, {
+            'n': names[i],
+            't': int(counts[i].sum()),
+            'c': counts[i].tolist(),
+            'f': values[bounds[i]:bounds[i + 1]].tolist(),
+        }]
+        for i, (lat, lon) in enumerate(zip(heads['lat'].astype(float).round(7).tolist(),
+                                            heads['lon'].astype(float).round(7).tolist()))
+    ]
+
+
+def _zone_slug(category):
+    return "n_" + "".join(c if c.isalnum() else "_" for c in str(category).lower())
+
+
+def zone_aggregates(df, categories):
+    """
+    Findings per `zona`: 'Total', 'Open' and the total per entry of
+    `categories` (the 'Near Miss' column is the near-miss count), indexed by
+    zone name. Two aggregate() calls, cached per sidebar view like the KPIs.
+    """
+    def compute():
+        columns = ['Total', 'Open', *categories]
+        if df.empty or 'zona' not in df.columns:
+            return pd.DataFrame(columns=columns, index=pd.Index([], name='zona'), dtype='int64')
+        totals = aggregate(df, ['zona'], measures=('Total', 'Open')).set_index('zona')
+        mix = aggregate(df, ['zona', 'temuan_kategori']).pivot_table(
+            index='zona', columns='temuan_kategori', values='Total', aggfunc='sum', fill_value=0, observed=True)
+        mix.columns = mix.columns.astype(str)
+        zones = totals.join(mix.reindex(columns=list(categories), fill_value=0)).fillna(0).astype('int64')
+        zones.index = zones.index.astype(str)
+        return zones[columns]
+
+    key = sidebar_view_key(df)
+    if key is None:
+        return compute()
+    return view_cache().get_or_compute((key, "zones", tuple(categories)), compute)
+
+
+@st.cache_data(show_spinner=False)
+def _read_geojson(path, mtime):
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_zones(path):
+    """The zone FeatureCollection at `path` (re-read when the file changes), or None if there is none."""
+    if not path or not os.path.exists(path):
+        return None
+    return _read_geojson(path, os.path.getmtime(path))
+
+
+def zone_features(zones, aggregates, zone_property, categories):
+    """
+    A copy of the `zones` FeatureCollection with each feature's aggregates
+    (zone_aggregates row matched on properties[`zone_property`], zeros for
+    zones without findings) in the properties 'n_total', 'n_open' and one
+    'n_<category>' per category. Returns the collection and the property key
+    of each category.
+    """
+    keys = {c: _zone_slug(c) for c in categories}
+    rows = aggregates.to_dict('index')
+    features = []
+    for feature in zones.get('features', []):
+        properties = dict(feature.get('properties') or {})
+        row = rows.get(str(properties.get(zone_property)), {})
+        properties['n_total'] = int(row.get('Total', 0))
+        properties['n_open'] = int(row.get('Open', 0))
+        for category, key in keys.items():
+            properties[key] = int(row.get(category, 0))
+        features.append({**feature, 'properties': properties})
+    return {**zones, 'features': features}, keys
+
+
+def frame_signature(df, columns):
+    """
+    Identifies the values of `columns` in `df`. The frame render_sidebar
+    returned is identified by its view key (same dataset version and
+    selection, same rows); any other frame by a hash of its contents.
+    """
+    key = sidebar_view_key(df)
+    if key is not None:
+        return ("view", key)
+    columns = [c for c in columns if c in df.columns]
+    hashed = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    return ("content", len(df), tuple(columns), hashlib.blake2b(hashed.tobytes(), digest_size=16).hexdigest())
+
+
+def cached_map_html(name, df, columns, build, **options):
+    """
+    HTML of the folium map `build()` returns for `df`, from the process-wide
+    map cache: keyed on the map `name`, the values of `columns` of `df` (all
+    the map reads) and `options` (anything else that changes the output).
+    Sessions with the same filter share one rendering.
+    """
+    key = ("map", name, frame_signature(df, columns), tuple(sorted(options.items())))
+    return map_cache().get_or_compute(key, lambda: build().get_root().render())
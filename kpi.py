@@ -0,0 +1,96 @@
+"""
+Headline metrics of a filtered findings frame.
+
+compute_kpis() derives every KPI card from one grouped pass: status counts
+come from a single value_counts over the (categorical) status codes, and
+time-to-resolve is computed on int64 timestamps of the closed findings.
+get_kpis() caches the result per sidebar view in the shared view cache, so
+every page showing the same filter reuses it.
+
+All counts are distinct `kode_temuan`; a frame with repeated findings is
+reduced to one row per finding first.
+"""
+import numpy as np
+import pandas as pd
+
+from perf import instrument
+from utils import sidebar_view_key, view_cache
+
+# Time-to-resolve percentiles reported next to the mean.
+MTTR_PERCENTILES = (50, 75, 90)
+
+_NS_PER_HOUR = 3600 * 10**9
+
+
+def _empty():
+    return {
+        "total": 0, "open": 0, "closed": 0, "butuh_verifikasi": 0, "near_miss_open": 0,
+        "closing_rate": 0.0, "participants": 0, "resolved": 0, "mttr_hours": None,
+        **{f"mttr_p{p}_hours": None for p in MTTR_PERCENTILES},
+    }
+
+
+def _resolve_hours(df, closed):
+    """Hours from open_at to close_at of the closed findings that have both timestamps."""
+    if 'open_at' not in df.columns or 'close_at' not in df.columns:
+        return np.empty(0)
+    opened = df['open_at'].to_numpy(dtype='datetime64[ns]')[closed].view(np.int64)
+    resolved = df['close_at'].to_numpy(dtype='datetime64[ns]')[closed].view(np.int64)
+    nat = np.iinfo(np.int64).min
+    valid = (opened != nat) & (resolved != nat) & (resolved >= opened)
+    return (resolved[valid] - opened[valid]) / _NS_PER_HOUR
+
+
+@instrument("kpi")
+def compute_kpis(df):
+    """Every headline metric of `df` as a dict (see _empty() for the keys)."""
+    kpis = _empty()
+    if df.empty or 'kode_temuan' not in df.columns:
+        return kpis
+    if not df['kode_temuan'].is_unique:
+        df = df.drop_duplicates('kode_temuan')
+
+    kpis["total"] = total = len(df)
+    if 'temuan_status' in df.columns:
+        status = df['temuan_status']
+        by_status = status.value_counts()
+        kpis["open"] = int(by_status.get('Open', 0))
+        kpis["closed"] = int(by_status.get('Closed', 0))
+        kpis["butuh_verifikasi"] = int(by_status.get('Butuh Verifikasi', 0))
+        kpis["closing_rate"] = kpis["closed"] / total * 100
+
+        closed = (status == 'Closed').to_numpy(dtype=bool, na_value=False)
+        hours = _resolve_hours(df, closed)
+        kpis["resolved"] = len(hours)
+        if len(hours):
+            kpis["mttr_hours"] = float(hours.mean())
+            for p, value in zip(MTTR_PERCENTILES, np.percentile(hours, MTTR_PERCENTILES)):
+                kpis[f"mttr_p{p}_hours"] = float(value)
+
+        if 'temuan_kategori' in df.columns:
+            near_miss = (df['temuan_kategori'] == 'Near Miss').to_numpy(dtype=bool, na_value=False)
+            kpis["near_miss_open"] = int((near_miss & (status == 'Open').to_numpy(dtype=bool, na_value=False)).sum())
+
+    if 'creator_name' in df.columns:
+        kpis["participants"] = int(df['creator_name'].nunique())
+    return kpis
+
+
+def get_kpis(df_filtered):
+    """
+    KPIs of the frame render_sidebar returned, cached per filter signature
+    (dataset version + selection). Any other frame is computed directly.
+    """
+    key = sidebar_view_key(df_filtered)
+    if key is None:
+        return compute_kpis(df_filtered)
+    return view_cache().get_or_compute((key, "kpi"), lambda: compute_kpis(df_filtered))
+
+
+def format_duration(hours):
+    """Human-readable time-to-resolve: hours below two days, days above."""
+    if hours is None or pd.isna(hours):
+        return "-"
+    if hours < 48:
+        return f"{hours:.1f} jam"
+    return f"{hours / 24:.1f} hari"
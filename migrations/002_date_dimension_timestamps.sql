@@ -0,0 +1,113 @@
+-- ==========================================
+-- Native timestamps on the date dimensions
+-- The date dimensions store their parts (several as float8), so every load
+-- used to rebuild five timestamps per row with MAKE_TIMESTAMP. Each dimension
+-- now carries a stored generated column `ts` that the load query reads as-is.
+--
+-- Generated columns are filled by Postgres on INSERT/UPDATE, so the ETL keeps
+-- writing the date parts only. It must append/truncate rather than drop and
+-- recreate these tables, or the column is lost.
+-- ==========================================
+
+ALTER TABLE public.dim_create_date ADD COLUMN IF NOT EXISTS ts timestamp GENERATED ALWAYS AS (
+  CASE WHEN "year" IS NOT NULL THEN MAKE_TIMESTAMP(
+    CAST("year" AS int), CAST("month" AS int), CAST("day" AS int),
+    CAST(hours AS int), CAST(minutes AS int), 0.0
+  ) END
+) STORED;
+
+ALTER TABLE public.dim_close_date ADD COLUMN IF NOT EXISTS ts timestamp GENERATED ALWAYS AS (
+  CASE WHEN "year" IS NOT NULL THEN MAKE_TIMESTAMP(
+    CAST("year" AS int), CAST("month" AS int), CAST("day" AS int),
+    CAST(hours AS int), CAST(minutes AS int), 0.0
+  ) END
+) STORED;
+
+ALTER TABLE public.dim_open_date ADD COLUMN IF NOT EXISTS ts timestamp GENERATED ALWAYS AS (
+  CASE WHEN "year" IS NOT NULL THEN MAKE_TIMESTAMP(
+    CAST("year" AS int), CAST("month" AS int), CAST("day" AS int),
+    CAST(hours AS int), CAST(minutes AS int), 0.0
+  ) END
+) STORED;
+
+ALTER TABLE public.dim_update_date ADD COLUMN IF NOT EXISTS ts timestamp GENERATED ALWAYS AS (
+  CASE WHEN "year" IS NOT NULL THEN MAKE_TIMESTAMP(
+    CAST("year" AS int), CAST("month" AS int), CAST("day" AS int),
+    CAST(hours AS int), CAST(minutes AS int), 0.0
+  ) END
+) STORED;
+
+ALTER TABLE public.dim_target_date ADD COLUMN IF NOT EXISTS ts timestamp GENERATED ALWAYS AS (
+  CASE WHEN "year" IS NOT NULL THEN MAKE_TIMESTAMP(
+    CAST("year" AS int), CAST("month" AS int), CAST("day" AS int),
+    CAST(hours AS int), CAST(minutes AS int), 0.0
+  ) END
+) STORED;
+
+-- Watermark lookups for incremental loads (see utils._delta_query).
+CREATE INDEX IF NOT EXISTS ix_dim_create_date_ts ON public.dim_create_date (ts);
+CREATE INDEX IF NOT EXISTS ix_dim_update_date_ts ON public.dim_update_date (ts);
+
+-- Rebuild the flat table on top of the new columns.
+DROP MATERIALIZED VIEW IF EXISTS public.mv_findings_flat;
+
+CREATE MATERIALIZED VIEW public.mv_findings_flat AS
+SELECT 
+  -- Fact Table Keys
+  f.kode_temuan, 
+  -- Create Date (tanggal pembuatan)
+  dd_create.ts AS tanggal, 
+  dd_create.day_name AS create_day_name, 
+  -- Close Date (tanggal penutupan)
+  dd_close.ts AS close_at, 
+  dd_close.day_name AS close_day_name, 
+  -- Open Date (tanggal dibuka)
+  dd_open.ts AS open_at, 
+  dd_open.day_name AS open_day_name, 
+  -- Update Date (tanggal update terakhir)
+  dd_update.ts AS update_at, 
+  dd_update.day_name AS update_day_name, 
+  -- Target Date (tanggal target penyelesaian)
+  dd_target.ts AS target_at, 
+  dd_target.day_name AS target_day_name, 
+  dc.creator_id, 
+  dc.creator_name, 
+  dc.creator_kode_jabatan, 
+  dc.nama_perusahaan AS creator_perusahaan, 
+  dc.creator_departemen_dan_role, 
+  dc.creator_role, 
+  dc.creator_departemen, 
+  dp.pic_id, 
+  dp.pic_name, 
+  dp.pic_departemen, 
+  dt.raw_judul, 
+  dt.raw_kondisi, 
+  dt.raw_rekomendasi, 
+  dt.temuan_nama, 
+  dt.temuan_kondisi, 
+  dt.temuan_rekomendasi, 
+  dt.temuan_kategori, 
+  dt.temuan_status, 
+  dt.temuan_nama_spesifik, 
+  dt.note AS temuan_note, 
+  dt.keterangan_lokasi, 
+  COALESCE(loc.nama_lokasi, f.tempat_id) AS nama_lokasi, 
+  loc.lat, 
+  loc.long AS lon, 
+  loc.zone AS zona 
+FROM 
+  public.fact_k3 f -- Temuan Dimension
+  LEFT JOIN public.dim_temuan dt ON f.kode_temuan = dt.kode_temuan -- Creator Dimension
+  LEFT JOIN public.dim_creator dc ON f.creator_id = dc.creator_id -- PIC Dimension
+  LEFT JOIN public.dim_pic dp ON f.kode_temuan = dp.kode_temuan -- Tempat/Lokasi Dimension
+  LEFT JOIN public.dim_tempat loc ON UPPER(f.tempat_id) = UPPER(loc.nama_lokasi) -- Create Date Dimension
+  LEFT JOIN public.dim_create_date dd_create ON f.kode_temuan = dd_create.kode_temuan -- Close Date Dimension
+  LEFT JOIN public.dim_close_date dd_close ON f.kode_temuan = dd_close.kode_temuan -- Open Date Dimension
+  LEFT JOIN public.dim_open_date dd_open ON f.kode_temuan = dd_open.kode_temuan -- Update Date Dimension
+  LEFT JOIN public.dim_update_date dd_update ON f.kode_temuan = dd_update.kode_temuan -- Target Date Dimension
+  LEFT JOIN public.dim_target_date dd_target ON f.kode_temuan = dd_target.kode_temuan
+WITH DATA;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_findings_flat_kode_temuan ON public.mv_findings_flat (kode_temuan);
+CREATE INDEX IF NOT EXISTS ix_mv_findings_flat_update_at ON public.mv_findings_flat (update_at);
+CREATE INDEX IF NOT EXISTS ix_mv_findings_flat_tanggal ON public.mv_findings_flat (tanggal);
@@ -0,0 +1,21 @@
+-- ==========================================
+-- Query plan history for `python cli.py explain` and the Diagnostik page.
+-- One row per analyzed query per run, so plans and timings can be compared
+-- as the warehouse grows.
+-- ==========================================
+
+CREATE TABLE IF NOT EXISTS public.dashboard_query_plans (
+  id bigserial PRIMARY KEY,
+  run_id text NOT NULL,
+  captured_at timestamptz NOT NULL DEFAULT now(),
+  query_name text NOT NULL,
+  source text NULL,
+  planning_ms double precision NULL,
+  execution_ms double precision NULL,
+  actual_rows bigint NULL,
+  flags jsonb NOT NULL DEFAULT '[]',
+  plan jsonb NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS dashboard_query_plans_query_idx
+  ON public.dashboard_query_plans (query_name, captured_at DESC);
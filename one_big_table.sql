@@ -2,54 +2,19 @@ SELECT
   -- Fact Table Keys
   f.kode_temuan, 
   -- Create Date (tanggal pembuatan)
-  CASE WHEN dd_create."year" IS NOT NULL THEN MAKE_TIMESTAMP(
-    CAST(dd_create."year" AS int), 
-    CAST(dd_create."month" AS int), 
-    CAST(dd_create."day" AS int), 
-    CAST(dd_create.hours AS int), 
-    CAST(dd_create.minutes AS int), 
-    0.0
-  ) ELSE NULL END AS tanggal, 
+  dd_create.ts AS tanggal, 
   dd_create.day_name AS create_day_name, 
   -- Close Date (tanggal penutupan)
-  CASE WHEN dd_close."year" IS NOT NULL THEN MAKE_TIMESTAMP(
-    CAST(dd_close."year" AS int), 
-    CAST(dd_close."month" AS int), 
-    CAST(dd_close."day" AS int), 
-    CAST(dd_close.hours AS int), 
-    CAST(dd_close.minutes AS int), 
-    0.0
-  ) ELSE NULL END AS close_at, 
+  dd_close.ts AS close_at, 
   dd_close.day_name AS close_day_name, 
   -- Open Date (tanggal dibuka)
-  CASE WHEN dd_open."year" IS NOT NULL THEN MAKE_TIMESTAMP(
-    CAST(dd_open."year" AS int), 
-    CAST(dd_open."month" AS int), 
-    CAST(dd_open."day" AS int), 
-    CAST(dd_open.hours AS int), 
-    CAST(dd_open.minutes AS int), 
-    0.0
-  ) ELSE NULL END AS open_at, 
+  dd_open.ts AS open_at, 
   dd_open.day_name AS open_day_name, 
   -- Update Date (tanggal update terakhir)
-  CASE WHEN dd_update."year" IS NOT NULL THEN MAKE_TIMESTAMP(
-    CAST(dd_update."year" AS int), 
-    CAST(dd_update."month" AS int), 
-    CAST(dd_update."day" AS int), 
-    CAST(dd_update.hours AS int), 
-    CAST(dd_update.minutes AS int), 
-    0.0
-  ) ELSE NULL END AS update_at, 
+  dd_update.ts AS update_at, 
   dd_update.day_name AS update_day_name, 
   -- Target Date (tanggal target penyelesaian)
-  CASE WHEN dd_target."year" IS NOT NULL THEN MAKE_TIMESTAMP(
-    CAST(dd_target."year" AS int), 
-    CAST(dd_target."month" AS int), 
-    CAST(dd_target."day" AS int), 
-    CAST(dd_target.hours AS int), 
-    CAST(dd_target.minutes AS int), 
-    0.0
-  ) ELSE NULL END AS target_at, 
+  dd_target.ts AS target_at, 
   dd_target.day_name AS target_day_name, 
   dc.creator_id, 
   dc.creator_name, 
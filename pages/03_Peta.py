@@ -1,29 +1,137 @@
+import json
+import os
 import streamlit as st
 import pandas as pd
 import folium
-from streamlit_folium import st_folium
-from folium.plugins import MarkerCluster, HeatMap
-from utils import load_data, render_sidebar, set_header_title, HSE_COLOR_MAP
+import streamlit.components.v1 as components
+from folium.plugins import FastMarkerCluster, HeatMap
+from utils import get_config, load_data, render_sidebar, set_header_title, tile_url, HSE_COLOR_MAP
+from constants import CUSTOM_SCALE
+from analytics import aggregate
+from perf import instrument, timed
+from geo import (
+    DETAIL_COLUMNS, cached_map_html, heat_data, load_zones, location_markers, location_weights, zone_aggregates,
+    zone_features,
+)
+from branca.colormap import LinearColormap
 from branca.element import Template, MacroElement
 
-def get_color(category):
-    cat_lower = str(category).lower()
-    if 'near miss' in cat_lower: return 'darkblue'      # #1A237E -> darkblue
-    if 'unsafe condition' in cat_lower: return 'orange' # #F57F17 -> orange
-    if 'unsafe action' in cat_lower: return 'red'       # #B71C1C -> red/darkred
-    if 'positive' in cat_lower: return 'darkgreen'      # #1B5E20 -> darkgreen
-    return 'cadetblue'
+# Light versions of HSE_COLOR_MAP colors (with transparency), used as popup backgrounds
+LIGHT_BG_COLORS = {
+    'Positive': 'rgba(27, 94, 32, 0.15)',           # Light green
+    'Unsafe Action': 'rgba(183, 28, 28, 0.15)',    # Light red
+    'Unsafe Condition': 'rgba(245, 127, 23, 0.15)', # Light amber
+    'Near Miss': 'rgba(26, 35, 126, 0.15)'         # Light indigo
+}
+MARKER_CATEGORIES = list(HSE_COLOR_MAP)
+# Every column the map is built from (keys the shared map cache).
+MAP_COLUMNS = ['lat', 'lon', 'nama_lokasi', 'tanggal', 'zona', *DETAIL_COLUMNS]
 
-def get_light_bg_color(category):
-    """Get lighter background color based on HSE category"""
-    # Light versions of HSE_COLOR_MAP colors (with transparency)
-    light_colors = {
-        'Positive': 'rgba(27, 94, 32, 0.15)',           # Light green
-        'Unsafe Action': 'rgba(183, 28, 28, 0.15)',    # Light red
-        'Unsafe Condition': 'rgba(245, 127, 23, 0.15)', # Light amber
-        'Near Miss': 'rgba(26, 35, 126, 0.15)'         # Light indigo
+LAYER_HEATMAP = "Heatmap"
+LAYER_MARKERS = "Penanda Lokasi"
+LAYER_ZONES = "Zona"
+
+# One marker per location (rows from geo.location_markers): a ring colored by the
+# category mix, sized by the number of findings. The popup HTML is only built when
+# the marker is opened, from the location's compact finding arrays.
+LOCATION_MARKER_JS = """
+(function () {
+    var CATEGORIES = %(categories)s;
+    var COLORS = %(colors)s.concat(['#5F9EA0']);
+    var LIGHT = %(light)s;
+    function esc(value) {
+        return String(value).replace(/[&<>"']/g, function (c) {
+            return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+        });
+    }
+    function ring(counts, total) {
+        var stops = [], start = 0;
+        for (var i = 0; i < counts.length; i++) {
+            if (!counts[i]) continue;
+            var end = start + counts[i] / total * 100;
+            stops.push(COLORS[i] + ' ' + start + '%% ' + end + '%%');
+            start = end;
+        }
+        return 'conic-gradient(' + stops.join(', ') + ')';
+    }
+    function popup(info) {
+        var html = '<div style="font-family: \\'Source Sans Pro\\', sans-serif; color: #00526A; min-width: 220px;">'
+            + '<b style="font-size: 14px;">' + esc(info.n) + '</b><br>' + info.t + ' temuan';
+        for (var i = 0; i < CATEGORIES.length; i++) {
+            if (info.c[i]) html += '<br><span style="color:' + COLORS[i] + ';">&#9679;</span> ' + esc(CATEGORIES[i]) + ': ' + info.c[i];
+        }
+        if (info.f.length < info.t) html += '<br><i>Menampilkan ' + info.f.length + ' temuan terbaru.</i>';
+        for (var j = 0; j < info.f.length; j++) {
+            var f = info.f[j];
+            html += '<div style="background-color: ' + (LIGHT[f[1]] || 'rgba(255, 255, 255, 0.9)')
+                + '; padding: 8px; border-radius: 8px; margin-top: 6px;">'
+                + '<b>' + esc(f[1]) + '</b><hr style="margin: 5px 0;">'
+                + '<b>Kode Temuan:</b> ' + esc(f[0]) + '<br>'
+                + '<b>Status :</b> ' + esc(f[2]) + '<br>'
+                + '<b>Judul:</b> ' + esc(f[3]) + '<br>'
+                + '<b>Temuan:</b> ' + esc(f[4]) + '<br><hr/>'
+                + '<b>Kondisi:</b> ' + esc(f[5]) + '<br>'
+                + '<b>Rekomendasi:</b> ' + esc(f[6]) + '<br>'
+                + '<b>Dibuka pada :</b> ' + esc(f[7]) + '</div>';
+        }
+        return html + '</div>';
     }
-    return light_colors.get(category, 'rgba(255, 255, 255, 0.9)')
+    return function (row) {
+        var info = row[2];
+        var size = Math.min(56, Math.round(18 + 6 * Math.log(info.t + 1)));
+        var icon = L.divIcon({
+            className: '',
+            iconSize: [size, size],
+            html: '<div style="width: ' + size + 'px; height: ' + size + 'px; border-radius: 50%%; background: '
+                + ring(info.c, info.t) + '; box-shadow: 1px 1px 4px rgba(0,0,0,0.4); display: flex;'
+                + ' align-items: center; justify-content: center;">'
+                + '<div style="width: 60%%; height: 60%%; border-radius: 50%%; background: white; color: #00526A;'
+                + ' font: bold 11px sans-serif; display: flex; align-items: center; justify-content: center;">'
+                + info.t + '</div></div>'
+        });
+        var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon, findings: info.t});
+        marker.bindPopup(function () { return popup(info); }, {maxWidth: 320, maxHeight: 400});
+        return marker;
+    };
+})()
+""" % {
+    'categories': json.dumps(MARKER_CATEGORIES),
+    'colors': json.dumps([HSE_COLOR_MAP[c] for c in MARKER_CATEGORIES]),
+    'light': json.dumps(LIGHT_BG_COLORS),
+}
+
+# Clusters show the number of findings below them, not the number of locations.
+CLUSTER_ICON_JS = """
+function (cluster) {
+    var n = 0;
+    cluster.getAllChildMarkers().forEach(function (m) { n += m.options.findings || 1; });
+    var size = n < 100 ? 'small' : (n < 1000 ? 'medium' : 'large');
+    return L.divIcon({html: '<div><span>' + n + '</span></div>',
+                      className: 'marker-cluster marker-cluster-' + size, iconSize: new L.Point(40, 40)});
+}
+"""
+
+def add_zone_layer(m, aggregates, zones, zone_property):
+    """Choropleth of findings per plant zone, with the zone's aggregates in the tooltip."""
+    collection, keys = zone_features(zones, aggregates, zone_property, MARKER_CATEGORIES)
+    totals = [f['properties']['n_total'] for f in collection['features']]
+    colormap = LinearColormap([CUSTOM_SCALE[0][1], CUSTOM_SCALE[-1][1]], vmin=0, vmax=max(totals + [1]),
+                              caption='Total Temuan per Zona')
+    folium.GeoJson(
+        collection,
+        name='Zona',
+        style_function=lambda feature: {
+            'fillColor': colormap(feature['properties']['n_total']),
+            'color': '#00526A', 'weight': 1, 'fillOpacity': 0.6,
+        },
+        highlight_function=lambda feature: {'weight': 3, 'fillOpacity': 0.8},
+        tooltip=folium.GeoJsonTooltip(
+            fields=[zone_property, 'n_total', 'n_open', *keys.values()],
+            aliases=['Zona', 'Total Temuan', 'Open', *keys.keys()],
+        ),
+    ).add_to(m)
+    colormap.add_to(m)
+
 st.set_page_config(page_title="Peta Risiko & Analisis Spasial", layout="wide")
 df_exploded, df_master, df_map = load_data()
 df_master_filtered, _, _ = render_sidebar(df_master, df_exploded)
@@ -38,81 +146,71 @@ with col_map:
             center_lat = -5.585357333271365
             center_lon = 105.38785245329919
             
-            df_pins = df_geo.copy() 
-            map_key = f"map_data_{len(df_geo)}"
-            if map_key not in st.session_state:
+            tiles = tile_url()
+            popup_max_findings = int(get_config("map", "popup_max_findings", 50))
+            zones_path = get_config("map", "zones_geojson", os.path.join("asset", "zones.geojson"))
+            zone_property = get_config("map", "zone_property", "zona")
+            zones = load_zones(zones_path)
+            layer_options = [LAYER_HEATMAP, LAYER_MARKERS] + ([LAYER_ZONES] if zones is not None else [])
+            layers = st.multiselect("Lapisan Peta", layer_options, default=layer_options,
+                                    key="peta_layers", label_visibility="collapsed")
+            if zones is None:
+                st.caption(f"Lapisan zona tidak tersedia: file GeoJSON zona `{zones_path}` tidak ditemukan.")
+
+            @instrument("peta.map_build")
+            def build_map(df_geo):
                 m = folium.Map(location=[center_lat, center_lon], zoom_start=17)
-                api_key = st.secrets["api"]
                 folium.TileLayer(
-                    tiles=f"https://tiles.stadiamaps.com/tiles/alidade_satellite/{{z}}/{{x}}/{{y}}{{r}}.jpg?api_key={api_key['stadia']}",
+                    tiles=tiles,
                     attr='&copy; Stadia Maps', name='Stadia Satellite'
                 ).add_to(m)
-                heat_data = [[row['lat'], row['lon']] for index, row in df_geo.iterrows()]
-                HeatMap(heat_data, radius=18, blur=12, name='Heatmap Temuan').add_to(m)
-                marker_cluster = MarkerCluster(name='Semua Temuan').add_to(m)
-                for _, row in df_pins.iterrows():
-                    kode_temuan = row.get('kode_temuan', '-')
-                    kategori = row.get('temuan_kategori', '-')
-                    temuan_nama = row.get('temuan_nama', '-')
-                    kondisi = row.get('raw_kondisi', '-')
-                    rekomendasi = row.get('raw_rekomendasi', '-')
-                    location = row.get('nama_lokasi', '-')
-                    judul = row.get('raw_judul', '-')
-                    status = row.get('temuan_status', 'Unknown')
-                    opened_at = row.get('open_at', '-')
-                    closed_at = row.get('close_at', '-') 
-                    bg_color = get_light_bg_color(kategori)
-                    
-                    popup_html = f"""
-                    <div style="font-family: 'Source Sans Pro', sans-serif; color: #00526A; min-width: 200px; 
-                                background-color: {bg_color}; padding: 10px; border-radius: 8px;">
-                        <b style="font-size: 14px;">{kategori}</b><hr style="margin: 5px 0;">
-                        <b>Kode Temuan:</b> {kode_temuan}<br>
-                        <b>Status :</b> {status}<br>
-                        <b>Judul:</b> {judul}<br>
-                        <b>Temuan:</b> {temuan_nama}<br>
-                        <hr/>
-                        <b>Kondisi:</b> {kondisi}<br>
-                        <b>Rekomendasi:</b> {rekomendasi}<br>
-                        <b>Lokasi :</b> {location}<br>
-                        <b>Dibuka pada :</b> {opened_at}<br>
-                        <!--<b>Ditutup pada :</b> {closed_at}<br>-->
+                if LAYER_ZONES in layers:
+                    add_zone_layer(m, zone_aggregates(df_master_filtered, MARKER_CATEGORIES), zones, zone_property)
+                if LAYER_HEATMAP in layers:
+                    # One weighted point per location instead of one point per finding
+                    HeatMap(heat_data(location_weights(df_geo)), radius=18, blur=12, name='Heatmap Temuan').add_to(m)
+                    if 'temuan_kategori' in df_geo.columns:
+                        # Per-category heat layers, off by default (toggle in the layer control)
+                        by_category = location_weights(df_geo, by='temuan_kategori')
+                        for kategori, points in by_category.groupby('temuan_kategori', observed=True):
+                            HeatMap(heat_data(points), radius=18, blur=12, name=f'Heatmap {kategori}',
+                                    show=False).add_to(m)
+                if LAYER_MARKERS in layers:
+                    markers = location_markers(df_geo, MARKER_CATEGORIES, max_details=popup_max_findings)
+                    FastMarkerCluster(markers, callback=LOCATION_MARKER_JS, name='Semua Temuan',
+                                      icon_create_function=CLUSTER_ICON_JS).add_to(m)
+
+                    legend_template = f"""
+                    {{% macro html(this, kwargs) %}}
+                    <div id='maplegend' class='maplegend' 
+                        style='position: absolute; z-index:9999; background-color: rgba(255, 255, 255, 0.85);
+                            border-radius: 8px; padding: 10px; font-size: 12px; bottom: 30px; left: 30px; 
+                            border: 1px solid grey; box-shadow: 2px 2px 5px rgba(0,0,0,0.3); font-family: sans-serif;'>
+                        <div class='legend-title' style='font-weight: bold; margin-bottom: 5px; font-size: 14px;'>Kategori Temuan</div>
+                        <div class='legend-scale'>
+                        <ul class='legend-labels' style='list-style: none; padding: 0; margin: 0;'>
+                            <li style='margin-bottom: 5px;'><span style='background:{HSE_COLOR_MAP['Near Miss']}; width: 15px; height: 15px; display: inline-block; margin-right: 5px; border-radius: 50%;'></span>Near Miss</li>
+                            <li style='margin-bottom: 5px;'><span style='background:{HSE_COLOR_MAP['Unsafe Action']}; width: 15px; height: 15px; display: inline-block; margin-right: 5px; border-radius: 50%;'></span>Unsafe Action</li>
+                            <li style='margin-bottom: 5px;'><span style='background:{HSE_COLOR_MAP['Unsafe Condition']}; width: 15px; height: 15px; display: inline-block; margin-right: 5px; border-radius: 50%;'></span>Unsafe Condition</li>
+                            <li style='margin-bottom: 5px;'><span style='background:{HSE_COLOR_MAP['Positive']}; width: 15px; height: 15px; display: inline-block; margin-right: 5px; border-radius: 50%;'></span>Positive</li>
+                        </ul>
+                        </div>
                     </div>
+                    {{% endmacro %}}
                     """
-                    
-                    if row['lat'] != 0 and row['lon'] != 0:
-                        folium.Marker(
-                            location=[row['lat'], row['lon']],
-                            popup=folium.Popup(popup_html, max_width=300),
-                            icon=folium.Icon(color=get_color(kategori), icon='info-sign')
-                        ).add_to(marker_cluster)
-                        
-                legend_template = f"""
-                {{% macro html(this, kwargs) %}}
-                <div id='maplegend' class='maplegend' 
-                    style='position: absolute; z-index:9999; background-color: rgba(255, 255, 255, 0.85);
-                        border-radius: 8px; padding: 10px; font-size: 12px; bottom: 30px; left: 30px; 
-                        border: 1px solid grey; box-shadow: 2px 2px 5px rgba(0,0,0,0.3); font-family: sans-serif;'>
-                    <div class='legend-title' style='font-weight: bold; margin-bottom: 5px; font-size: 14px;'>Kategori Temuan</div>
-                    <div class='legend-scale'>
-                    <ul class='legend-labels' style='list-style: none; padding: 0; margin: 0;'>
-                        <li style='margin-bottom: 5px;'><span style='background:{HSE_COLOR_MAP['Near Miss']}; width: 15px; height: 15px; display: inline-block; margin-right: 5px; border-radius: 50%;'></span>Near Miss</li>
-                        <li style='margin-bottom: 5px;'><span style='background:{HSE_COLOR_MAP['Unsafe Action']}; width: 15px; height: 15px; display: inline-block; margin-right: 5px; border-radius: 50%;'></span>Unsafe Action</li>
-                        <li style='margin-bottom: 5px;'><span style='background:{HSE_COLOR_MAP['Unsafe Condition']}; width: 15px; height: 15px; display: inline-block; margin-right: 5px; border-radius: 50%;'></span>Unsafe Condition</li>
-                        <li style='margin-bottom: 5px;'><span style='background:{HSE_COLOR_MAP['Positive']}; width: 15px; height: 15px; display: inline-block; margin-right: 5px; border-radius: 50%;'></span>Positive</li>
-                    </ul>
-                    </div>
-                </div>
-                {{% endmacro %}}
-                """
-                macro = MacroElement()
-                macro._template = Template(legend_template)
-                m.get_root().add_child(macro)
+                    macro = MacroElement()
+                    macro._template = Template(legend_template)
+                    m.get_root().add_child(macro)
 
                 folium.LayerControl().add_to(m)
-                st.session_state[map_key] = m
+                return m
 
-            st_folium(st.session_state[map_key], width="100%", height=600, returned_objects=[])
+            # Rendered once per filter and shared by every session (see geo.cached_map_html)
+            map_html = cached_map_html("peta", df_master_filtered, MAP_COLUMNS, lambda: build_map(df_geo),
+                                       tiles=tiles, popup_max_findings=popup_max_findings, layers=tuple(layers),
+                                       zones=(zones_path, zone_property, os.path.getmtime(zones_path)) if zones else None)
+            with timed("peta.map_render"):
+                components.html(map_html, height=600)
         else:
             st.warning("Tidak ada kecocokan koordinat untuk data yang difilter.")
     else:
@@ -121,7 +219,7 @@ with col_map:
 with col_details:
     st.markdown("### 20 Lokasi Temuan Teratas")
     if 'nama_lokasi' in df_master_filtered.columns:
-        top_locs = df_master_filtered.groupby('nama_lokasi')['kode_temuan'].nunique().sort_values(ascending=False).head(20).reset_index(name='Total')
+        top_locs = aggregate(df_master_filtered, ['nama_lokasi']).sort_values('Total', ascending=False).head(20)
         st.dataframe(top_locs, hide_index=True, use_container_width=True)
-        no_locs = df_master_filtered[df_master_filtered['lat']==0].groupby('nama_lokasi')['kode_temuan'].nunique().sort_values(ascending=False).reset_index(name='Total')
+        no_locs = df_master_filtered[df_master_filtered['lat']==0].groupby('nama_lokasi', observed=True)['kode_temuan'].nunique().sort_values(ascending=False).reset_index(name='Total')
         st.dataframe(no_locs, hide_index=True, use_container_width=True)
\ No newline at end of file
@@ -4,7 +4,10 @@ import plotly.express as px
 import plotly.graph_objects as go
 import folium
 from streamlit_folium import st_folium
-from utils import load_data, render_sidebar, set_header_title, HSE_COLOR_MAP
+from utils import load_data, render_sidebar, set_header_title, tile_url, HSE_COLOR_MAP
+from kpi import get_kpis
+from analytics import aggregate
+from perf import instrument, timed
 import folium
 from folium.plugins import MarkerCluster
 import streamlit.components.v1 as components
@@ -15,7 +18,7 @@ df_master_filtered, _ = render_sidebar(df_master, df_exploded)[:2]
 set_header_title("Analisis Kinerja Personil")
 # --- A. KPI Row ---
 # KPI Logic
-unique_reporters = df_master_filtered['creator_name'].nunique() if 'creator_name' in df_master_filtered.columns else 0
+unique_reporters = get_kpis(df_master_filtered)['participants']
 
 max_workload = 0
 top_pic = "-"
@@ -51,10 +54,7 @@ df_dept = pd.DataFrame()
 
 if dept_col:
     # 1. Calculate detailed breakdown
-    df_dept = df_master_filtered.groupby(dept_col).agg(
-        Total=('kode_temuan', 'nunique'),
-        Closed=('temuan_status', lambda x: (x.str.lower() == 'closed').sum())
-    ).reset_index()
+    df_dept = aggregate(df_master_filtered, [dept_col], measures=('Total', 'Closed'))
     
     df_dept['Open'] = df_dept['Total'] - df_dept['Closed']
     df_dept['Compliance%'] = (df_dept['Closed'] / df_dept['Total'] * 100).round(1)
@@ -228,7 +228,7 @@ with tab_dept:
         
         if 'creator_departemen' in df_master_filtered.columns and 'temuan_kategori' in df_master_filtered.columns:
             # 1. Create the base matrix
-            df_matrix = df_master_filtered.groupby(['creator_departemen', 'temuan_kategori']).size().reset_index(name='Count')
+            df_matrix = aggregate(df_master_filtered, ['creator_departemen', 'temuan_kategori'], measures=('Count',))
             
             # Truncate long department names (max 30 chars)
             def truncate_role(name, limit=30):
@@ -428,12 +428,14 @@ with tab_personnel:
         # Include Role and Team Role (taking the first/most common value for that person)
         agg_dict = {
             'kode_temuan': 'count',
-            'temuan_status': lambda x: (x == 'Open').sum()
+            '_open': 'sum'
         }
         if 'creator_role' in df_master_filtered.columns: agg_dict['creator_role'] = 'first'
         if 'creator_departemen' in df_master_filtered.columns: agg_dict['creator_departemen'] = 'first'
         
-        df_perf = df_master_filtered.groupby('creator_name').agg(agg_dict).reset_index()
+        # Boolean open flag: summing it stays int64 even on an empty (categorical) view
+        df_open = df_master_filtered.assign(_open=df_master_filtered['temuan_status'].eq('Open'))
+        df_perf = df_open.groupby('creator_name').agg(agg_dict).reset_index()
         
         # Renaissance Columns
         new_cols = ['Reporter', 'Total Temuan', 'Open Count']
@@ -565,7 +567,8 @@ with tab_personnel:
         
         with c_pie:
             if 'temuan_kategori' in df_reported_by.columns:
-                risk_counts = df_reported_by['temuan_kategori'].value_counts().reset_index()
+                risk_counts = df_reported_by['temuan_kategori'].value_counts()
+                risk_counts = risk_counts[risk_counts > 0].reset_index()
                 risk_counts.columns = ['Category', 'Count']
                 
                 # Use Global Palette
@@ -646,18 +649,17 @@ with tab_personnel:
         if has_lat and has_lon:
             df_geo = df_reported_by.dropna(subset=['lat', 'lon'])
             
-            if not df_geo.empty:
-
-                
+            @instrument("departemen.map_build")
+            def build_report_map(df_geo):
                 # Fixed center (PLTU Sebalang location)
                 center_lat = -5.585357333271365
                 center_lon = 105.38785245329919
                 
                 m = folium.Map(location=[center_lat, center_lon], zoom_start=15)
                 
-                # Stadia Satellite Layer (with API key)
+                # Stadia Satellite Layer (through the tile proxy when configured)
                 folium.TileLayer(
-                    tiles='https://tiles.stadiamaps.com/tiles/alidade_satellite/{z}/{x}/{y}{r}.jpg?api_key=0956e908-f9e5-41a5-9d89-f01b65803cc9',
+                    tiles=tile_url(),
                     attr='&copy; Stadia Maps', name='Stadia Satellite'
                 ).add_to(m)
                 
@@ -689,7 +691,12 @@ with tab_personnel:
                         icon=folium.Icon(color=get_color(kategori), icon='info-sign')
                     ).add_to(m)
                 
-                st_folium(m, width="100%", height=400, returned_objects=[])
+                return m
+
+            if not df_geo.empty:
+                m = build_report_map(df_geo)
+                with timed("departemen.map_render"):
+                    st_folium(m, width="100%", height=400, returned_objects=[])
             else:
                 st.info("Tidak ada data lokasi untuk temuan pelapor ini.")
         else:
@@ -0,0 +1,148 @@
+import hmac
+import streamlit as st
+import pandas as pd
+from utils import load_css, set_header_title, get_config, get_data_status, map_cache, pool_status, view_cache
+from query_plans import DiagnosticsBusy, plan_history, run_diagnostics_once, stored_run
+
+st.set_page_config(page_title="Diagnostik Sistem", page_icon=None, layout="wide")
+load_css()
+st.sidebar.image("./asset/logo-pln.png", width=200)
+set_header_title("Diagnostik Sistem")
+
+# --- A. Connection Pool ---
+st.subheader("Koneksi Database")
+st.caption("Tekanan pool koneksi bersama (semua sesi dalam container ini).")
+try:
+    pool = pool_status()
+except Exception as e:
+    pool = None
+    st.warning(f"Engine database belum dikonfigurasi: {e}")
+
+if pool:
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Checked-out", f"{pool['checked_out']} / {pool['size']}")
+    c2.metric("Overflow", f"{pool['overflow']} / {pool['max_overflow']}")
+    c3.metric("Rata-rata Tunggu", f"{pool['avg_wait_ms']} ms")
+    c4.metric("Tunggu Maksimum", f"{pool['max_wait_ms']} ms")
+    st.caption(f"{pool['checkouts']} checkout, {pool['retries']} percobaan ulang koneksi.")
+
+# --- B. Data Load ---
+st.subheader("Pemuatan Data")
+status = get_data_status()
+c1, c2, c3 = st.columns(3)
+c1.metric("Jumlah Temuan", status['rows'])
+c2.metric("Sumber", f"{status['origin'] or '-'} ({status['source'] or '-'})")
+c3.metric("Dimuat Pada", status['loaded_at'].strftime("%d %b %Y %H:%M") if status['loaded_at'] else "-")
+if status['error']:
+    st.error(f"Refresh terakhir gagal: {status['error']}")
+
+if status['load_stats']:
+    stats = status['load_stats']
+    st.caption(f"Load terakhir: {stats['rows']} baris dalam {stats['chunks']} chunk, "
+               f"peak RSS {stats['peak_rss_mb']} MiB (sebelum load {stats['rss_before_mb']} MiB).")
+
+if status['memory_report']:
+    df_mem = pd.DataFrame(status['memory_report'])
+    df_mem['Sebelum (KiB)'] = (df_mem['before_bytes'] / 1024).round(1)
+    df_mem['Sesudah (KiB)'] = (df_mem['after_bytes'] / 1024).round(1)
+    df_mem['Hemat (KiB)'] = df_mem['Sebelum (KiB)'] - df_mem['Sesudah (KiB)']
+    st.markdown("**Memori per Kolom**")
+    st.dataframe(df_mem[['column', 'Sebelum (KiB)', 'Sesudah (KiB)', 'Hemat (KiB)']].rename(columns={'column': 'Kolom'}),
+                 hide_index=True, use_container_width=True)
+
+# --- C. Filtered View Cache ---
+st.subheader("Cache Tampilan Filter")
+st.caption("Hasil filter sidebar yang dipakai bersama oleh semua halaman dan sesi.")
+cache = view_cache().stats()
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Hit Rate", f"{cache['hit_rate']:.0%}")
+c2.metric("Hit / Miss", f"{cache['hits']} / {cache['misses']}")
+c3.metric("Entri", f"{cache['entries']} / {cache['max_entries']}")
+c4.metric("Memori", f"{cache['bytes'] / 2**20:.1f} / {cache['max_bytes'] / 2**20:.0f} MiB")
+st.caption(f"{cache['evictions']} entri dikeluarkan (LRU).")
+
+st.caption("Peta yang sudah dirender (HTML), dipakai bersama oleh sesi dengan filter yang sama.")
+maps = map_cache().stats()
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Hit Rate Peta", f"{maps['hit_rate']:.0%}")
+c2.metric("Hit / Miss", f"{maps['hits']} / {maps['misses']}")
+c3.metric("Peta", f"{maps['entries']} / {maps['max_entries']}")
+c4.metric("Memori", f"{maps['bytes'] / 2**20:.1f} / {maps['max_bytes'] / 2**20:.0f} MiB")
+
+# --- D. Query Plans ---
+st.subheader("Rencana Kueri")
+st.caption("EXPLAIN (ANALYZE, BUFFERS) atas kueri load dan setiap join dimensi. "
+           "Diagnostik ini mengeksekusi kueri load secara penuh, jalankan di luar jam sibuk.")
+
+# Admin only: each run costs about one full load on the warehouse.
+if not get_config("diagnostics", "enabled", False):
+    st.info("Diagnostik kueri dinonaktifkan. Aktifkan dengan `[diagnostics] enabled = true` di secrets.toml.")
+    st.stop()
+admin_password = str(get_config("diagnostics", "admin_password", "") or "")
+if admin_password and not st.session_state.get('diagnostics_admin'):
+    entered = st.text_input("Kata sandi admin", type="password", key="diagnostics_password")
+    if not entered:
+        st.stop()
+    if not hmac.compare_digest(entered.encode(), admin_password.encode()):
+        st.error("Kata sandi admin salah.")
+        st.stop()
+    st.session_state['diagnostics_admin'] = True
+
+if pool:
+    if st.button("Jalankan Diagnostik Kueri"):
+        with st.spinner("Menjalankan EXPLAIN ANALYZE..."):
+            try:
+                results, stored = run_diagnostics_once(float(get_config("diagnostics", "cooldown_seconds", 600)))
+                st.session_state['plan_results'] = results
+                if not stored:
+                    st.info("Tabel riwayat rencana belum ada. Jalankan `python cli.py migrate` agar hasil tersimpan.")
+            except DiagnosticsBusy as e:
+                if e.retry_after is None:
+                    st.warning("Diagnostik kueri sedang berjalan dari sesi lain. Coba lagi setelah selesai.")
+                else:
+                    st.warning(f"Diagnostik kueri baru saja dijalankan. Coba lagi dalam {e.retry_after / 60:.0f} menit.")
+            except Exception as e:
+                st.error(f"Diagnostik kueri gagal: {e}")
+
+    try:
+        history = plan_history()
+    except Exception as e:
+        history = pd.DataFrame()
+        st.caption(f"Riwayat rencana tidak dapat dibaca: {e}")
+
+    results = st.session_state.get('plan_results')
+    if results is None and not history.empty:
+        results = stored_run(history['run_id'].iloc[0])
+
+    if results:
+        st.caption(f"Hasil per {results[0]['captured_at']:%d %b %Y %H:%M} (sumber: {results[0]['source']}).")
+        df_plans = pd.DataFrame([{
+            'Kueri': r['query_name'],
+            'Eksekusi (ms)': round(r['execution_ms'], 1) if r.get('execution_ms') is not None else None,
+            'Planning (ms)': round(r['planning_ms'], 1) if r.get('planning_ms') is not None else None,
+            'Baris': r.get('actual_rows'),
+            'Peringatan': sum(f['severity'] == 'warning' for f in r['flags']),
+        } for r in results])
+        st.dataframe(df_plans, hide_index=True, use_container_width=True)
+
+        for r in results:
+            if r.get('error'):
+                st.error(f"{r['query_name']}: {r['error']}")
+            for flag in r['flags']:
+                if flag['severity'] == 'warning':
+                    st.warning(f"{r['query_name']}: {flag['detail']}")
+
+        for r in results:
+            if r.get('plan'):
+                with st.expander(f"Rencana: {r['query_name']}"):
+                    if r.get('sql'):
+                        st.code(r['sql'], language='sql')
+                    for flag in r['flags']:
+                        st.caption(f"[{flag['severity']}] {flag['detail']}")
+                    st.json(r['plan'], expanded=False)
+
+    if not history.empty and history['run_id'].nunique() > 1:
+        st.markdown("**Riwayat Waktu Eksekusi (ms)**")
+        st.line_chart(history.pivot_table(index='captured_at', columns='query_name', values='execution_ms'))
+else:
+    st.info("Diagnostik kueri membutuhkan koneksi data warehouse.")
@@ -3,9 +3,11 @@ import plotly.graph_objects as go
 import streamlit as st
 
 from constants import HSE_COLOR_MAP
+from perf import instrument
 from utils import hex_to_rgba
 
 
+@instrument("temuan.alurKategori")
 def alurKategori(df_exploded_filtered: pd.DataFrame) -> None:
     """Render tab 'Alur Kategori Temuan' (Sankey: Kategori → Objek → Lokasi)."""
     if df_exploded_filtered is None or df_exploded_filtered.empty:
@@ -61,7 +63,7 @@ def alurKategori(df_exploded_filtered: pd.DataFrame) -> None:
     parent_to_cat_map = {}
     if len(cols) > 1:
         try:
-            p_to_c = df_sankey.groupby(cols[1])[cols[0]].agg(lambda x: x.mode()[0])
+            p_to_c = df_sankey.groupby(cols[1], observed=True)[cols[0]].agg(lambda x: x.mode()[0])
             parent_to_cat_map = p_to_c.to_dict()
         except Exception:
             parent_to_cat_map = {}
@@ -69,7 +71,7 @@ def alurKategori(df_exploded_filtered: pd.DataFrame) -> None:
     for i in range(len(cols) - 1):
         src_col = cols[i]
         tgt_col = cols[i + 1]
-        link_df = df_sankey.groupby([src_col, tgt_col]).size().reset_index(name='Count')
+        link_df = df_sankey.groupby([src_col, tgt_col], observed=True).size().reset_index(name='Count')
         link_df = link_df.sort_values('Count', ascending=False)
 
         for _, row in link_df.iterrows():
@@ -1,9 +1,11 @@
 import pandas as pd
 import streamlit as st
 
+from perf import instrument
 from utils import render_wordcloud
 
 
+@instrument("temuan.analisisKondisi")
 def analisisKondisi(df_exploded_filtered: pd.DataFrame) -> None:
     """Render tab 'Analisis Kondisi' (wordcloud kondisi + objek)."""
     st.caption("Visualisasi kata yang paling sering muncul berdasarkan data temuan")
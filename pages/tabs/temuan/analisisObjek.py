@@ -4,8 +4,10 @@ import plotly.graph_objects as go
 import streamlit as st
 from plotly.subplots import make_subplots
 from constants import CUSTOM_SCALE, HSE_COLOR_MAP
+from perf import instrument
 
 
+@instrument("temuan.analisisObjek")
 def analisisObjek(df_exploded_filtered: pd.DataFrame) -> None:
     """Render tab 'Analisis Objek' (Pareto + Treemap) for the given dataframe."""
     selected_parent = "Semua"
@@ -112,7 +114,7 @@ def analisisObjek(df_exploded_filtered: pd.DataFrame) -> None:
                     if breakdown_cat and 'temuan_kategori' in df_analysis.columns:
                         target_cols.append('temuan_kategori')
                     path = [px.Constant("Semua Temuan")] + target_cols
-                    df_obj_tree = df_analysis.groupby(target_cols).size().reset_index(name='Count')
+                    df_obj_tree = df_analysis.groupby(target_cols, observed=True).size().reset_index(name='Count')
                     
                     if max_items != "Semua":
                         top_parents = df_obj_tree.groupby('temuan_parent')['Count'].sum().nlargest(max_items).index
@@ -123,7 +125,7 @@ def analisisObjek(df_exploded_filtered: pd.DataFrame) -> None:
                         target_cols.append('temuan_kategori')
                     
                     path = [px.Constant(selected_parent.upper())] + target_cols
-                    df_obj_tree = df_analysis.groupby(target_cols).size().reset_index(name='Count')
+                    df_obj_tree = df_analysis.groupby(target_cols, observed=True).size().reset_index(name='Count')
                     
                     if max_items != "Semua":
                         df_obj_tree = df_obj_tree.nlargest(max_items, 'Count')
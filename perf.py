@@ -0,0 +1,132 @@
+"""
+Per-rerun timing of the dashboard's stages.
+
+Wrap a block in `with timed("stage") as t:` (set t["rows"] to report how many
+rows it handled) or decorate a function with @instrument("stage"). Each
+measurement is written as one JSON log line on the "perf" logger and kept
+with the session's current rerun, so the opt-in sidebar "Performance"
+panel (`[perf] panel = true`) can show where the time went.
+
+load_data() starts a new rerun. Stages timed outside a Streamlit session
+(background refresh, CLI) are only logged.
+"""
+import functools
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+logger = logging.getLogger("perf")
+if not logger.handlers:
+    # One JSON object per line on stderr, independent of the root logging setup.
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_RUN_KEY = "_perf_run"
+
+
+def _session_run():
+    """(script run context, current rerun record); both None outside a Streamlit session."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        return None, None
+    return ctx, st.session_state.get(_RUN_KEY)
+
+
+def start_run():
+    """Begins a new rerun record for this session; earlier stages are dropped."""
+    ctx, previous = _session_run()
+    if ctx is None:
+        return
+    st.session_state[_RUN_KEY] = {
+        "seq": previous["seq"] + 1 if previous else 1,
+        "started": time.perf_counter(),
+        "stages": [],
+        "panel": None,
+    }
+
+
+def _rows_of(result, args):
+    """Row count for a stage: the returned frame, else the first frame argument."""
+    if isinstance(result, tuple) and result and isinstance(result[0], pd.DataFrame):
+        result = result[0]
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    for arg in args:
+        if isinstance(arg, pd.DataFrame):
+            return len(arg)
+    return None
+
+
+@contextmanager
+def timed(stage, rows=None):
+    """Times the block as `stage`. The yielded dict's "rows" may be set inside the block."""
+    info = {"rows": rows}
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield info
+    except Exception:
+        failed = True
+        raise
+    finally:
+        _record(stage, (time.perf_counter() - start) * 1000, info["rows"], failed)
+
+
+def instrument(stage):
+    """Decorator form of timed(); row counts are taken from the result or the first DataFrame argument."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage) as info:
+                result = fn(*args, **kwargs)
+                info["rows"] = _rows_of(result, args)
+            return result
+        return wrapper
+    return decorator
+
+
+def _record(stage, ms, rows, failed):
+    ctx, run = _session_run()
+    entry = {"stage": stage, "ms": round(ms, 1), "rows": rows}
+    if failed:
+        entry["error"] = True
+    line = {"event": "perf", **entry}
+    if ctx is not None:
+        line["session"] = ctx.session_id
+    if run is not None:
+        line["run"] = run["seq"]
+        run["stages"].append(entry)
+        if run["panel"] is not None:
+            _draw(run)
+    logger.info(json.dumps(line))
+
+
+def render_panel():
+    """
+    Adds the "Performance" expander to the sidebar. It lists the stages of
+    the current rerun and keeps updating as later stages finish.
+    """
+    _, run = _session_run()
+    if run is None:
+        return
+    run["panel"] = st.sidebar.expander("Performance").empty()
+    _draw(run)
+
+
+def _draw(run):
+    total_ms = (time.perf_counter() - run["started"]) * 1000
+    table = pd.DataFrame(
+        [(s["stage"], s["ms"], s["rows"]) for s in run["stages"]],
+        columns=["Tahap", "Durasi (ms)", "Baris"],
+    ).astype({"Baris": "Int64"})
+    with run["panel"].container():
+        st.caption(f"Rerun #{run['seq']}: {total_ms:,.0f} ms sejauh ini")
+        st.dataframe(table, hide_index=True, use_container_width=True)
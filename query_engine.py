@@ -0,0 +1,246 @@
+"""
+Filter backends for the sidebar.
+
+`[engine] backend` picks how the sidebar narrows the findings:
+
+- "pandas" (default): a FacetIndex of per-value row bitmaps, built once per
+  dataset load; any combination of facet selections is a few bitwise
+  AND/ORs plus one take. PandasFacetFilter (boolean masks) remains for
+  frames that are not the shared dataset.
+- "duckdb": the shared findings frame is loaded once per dataset version into
+  an in-process DuckDB database and every facet lookup / filter runs there as
+  vectorized, multi-threaded SQL. Only the matching row positions come back.
+
+Every backend offers isin(column, values) to select, facet_counts(columns)
+for the sidebar's option counts (see facet_rows) and result().
+
+DuckDB is optional (`pip install duckdb`); it is imported on first use.
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+DUCKDB_TABLE = "findings"
+
+# Columns the sidebar filters on.
+FACET_COLUMNS = ('temuan_kategori', 'temuan_status', 'nama_lokasi', 'creator_departemen')
+
+
+def date_bounds(epoch, start_date, end_date):
+    """[lo, hi) row positions of start_date..end_date (inclusive) in a sorted epoch-ns array."""
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    lo, hi = np.searchsorted(epoch, [start.value, end.value], side='left')
+    return int(lo), int(hi)
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def get_duckdb_connection(_df, version):
+    """
+    In-process DuckDB database holding `_df` as table `findings`, plus a
+    `_row` column with each row's position in `_df`. One database per dataset
+    version; callers should query through `.cursor()` so sessions don't share
+    a connection.
+    """
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError("The duckdb engine backend needs the duckdb package: pip install duckdb") from e
+
+    con = duckdb.connect(database=":memory:")
+    source = _df.assign(_row=np.arange(len(_df), dtype=np.int64))
+    con.register("findings_source", source)
+    con.execute(f"CREATE TABLE {DUCKDB_TABLE} AS SELECT * FROM findings_source")
+    con.unregister("findings_source")
+    return con
+
+
+def facet_rows(masks, n, columns):
+    """
+    Yields (column, positions) for disjunctive facet counting: each column's
+    positions are the rows passing every *other* column's mask, so a facet's
+    counts show what selecting another of its values would add. One sweep
+    counts how many masks each row fails; rows failing none count for every
+    column, rows failing exactly one count only for that column.
+    """
+    if not masks:
+        everything = np.arange(n)
+        for column in columns:
+            yield column, everything
+        return
+    fails = np.zeros(n, dtype=np.uint8)
+    for mask in masks.values():
+        fails += ~mask
+    candidates = np.flatnonzero(fails <= 1)
+    clean = fails[candidates] == 0
+    for column in columns:
+        if column in masks:
+            yield column, candidates[clean | ~masks[column][candidates]]
+        else:
+            yield column, candidates[clean]
+
+
+class PandasFacetFilter:
+    """Boolean masks over an already date-filtered frame, one per selected facet."""
+
+    def __init__(self, df):
+        self.df = df
+        self.masks = {}
+
+    def facet_counts(self, columns):
+        counts = {}
+        for column, rows in facet_rows(self.masks, len(self.df), columns):
+            values = self.df[column].iloc[rows].value_counts()
+            counts[column] = {str(v): int(c) for v, c in values.items() if c}
+        return counts
+
+    def isin(self, column, values):
+        mask = self.df[column].isin(values).to_numpy()
+        self.masks[column] = mask & self.masks[column] if column in self.masks else mask
+
+    def result(self):
+        if not self.masks:
+            return self.df
+        return self.df[np.logical_and.reduce(list(self.masks.values()))]
+
+
+class DuckDBFacetFilter:
+    """Same interface as PandasFacetFilter, evaluated as SQL over the DuckDB copy of `df`."""
+
+    def __init__(self, con, df, start_date, end_date):
+        self.con = con
+        self.df = df
+        self.where = ["tanggal >= $start", "tanggal < $end"]
+        self.conditions = []
+        self.params = {"start": start_date, "end": end_date + timedelta(days=1)}
+
+    def _clause(self, skip=None):
+        return " AND ".join(self.where + [sql for column, sql in self.conditions if column != skip])
+
+    def facet_counts(self, columns):
+        # One statement: a GROUP BY per facet, each without that facet's own condition.
+        # NULLs are never offered: selecting them could not match anything anyway.
+        parts = [
+            f"SELECT {i} AS facet, CAST(\"{column}\" AS VARCHAR) AS value, COUNT(*) AS n "
+            f"FROM {DUCKDB_TABLE} WHERE {self._clause(skip=column)} AND \"{column}\" IS NOT NULL GROUP BY 2"
+            for i, column in enumerate(columns)
+        ]
+        counts = {column: {} for column in columns}
+        if parts:
+            for facet, value, n in self.con.cursor().execute(" UNION ALL ".join(parts), self.params).fetchall():
+                counts[columns[facet]][value] = n
+        return counts
+
+    def isin(self, column, values):
+        name = f"p{len(self.params)}"
+        self.conditions.append((column, f'"{column}" = ANY(${name})'))
+        self.params[name] = [str(v) for v in values]
+
+    def result(self):
+        sql = f"SELECT _row FROM {DUCKDB_TABLE} WHERE {self._clause()}"
+        rows = self.con.cursor().execute(sql, self.params).fetchnumpy()["_row"]
+        rows.sort()
+        return self.df.take(rows)
+
+
+class FacetIndex:
+    """
+    Row bitmaps per value of the FACET_COLUMNS, built once per dataset load.
+
+    A value matching at least 1/32 of the rows gets a packed bitmap (one bit
+    per row, np.packbits); rarer values keep their sorted int32 row positions,
+    which is smaller. Memory per column therefore stays under ~8 bytes per row
+    however many locations there are.
+    """
+
+    def __init__(self, df, columns=FACET_COLUMNS):
+        self.n = len(df)
+        self.nbytes = (self.n + 7) // 8
+        self.codes = {}
+        self.categories = {}
+        self.entries = {}
+        for column in columns:
+            if column in df.columns:
+                self._add(column, df[column])
+
+    def _add(self, column, values):
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype('category')
+        codes = values.cat.codes.to_numpy()
+        categories = [str(c) for c in values.cat.categories]
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(categories) + 1), side='left')
+
+        entries = {}
+        for i, value in enumerate(categories):
+            rows = order[bounds[i]:bounds[i + 1]]
+            if len(rows) * 32 >= self.n:
+                bits = np.zeros(self.n, dtype=bool)
+                bits[rows] = True
+                entries[value] = np.packbits(bits)
+            elif len(rows):
+                entries[value] = rows.astype(np.int32)
+        self.codes[column] = codes
+        self.categories[column] = categories
+        self.entries[column] = entries
+
+    def bitmap(self, column, values):
+        """Packed bitmap of the rows whose `column` is any of `values`."""
+        out = np.zeros(self.nbytes, dtype=np.uint8)
+        for value in values:
+            entry = self.entries[column].get(str(value))
+            if entry is None:
+                continue
+            if entry.dtype == np.uint8:
+                np.bitwise_or(out, entry, out=out)
+            else:
+                np.bitwise_or.at(out, entry >> 3, (128 >> (entry & 7)).astype(np.uint8))
+        return out
+
+    def unpack(self, bitmap, lo, hi):
+        """Boolean mask of rows lo..hi-1 of a packed bitmap."""
+        first = lo >> 3
+        bits = np.unpackbits(bitmap[first:(hi + 7) >> 3]).view(bool)
+        return bits[lo - first * 8:hi - first * 8]
+
+    def counts(self, column, rows):
+        """{value: occurrences} of `column` over `rows` (missing values excluded)."""
+        codes = self.codes[column][rows]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.categories[column]))
+        return {self.categories[column][i]: int(counts[i]) for i in np.flatnonzero(counts)}
+
+
+class BitmapFacetFilter:
+    """
+    Same interface as PandasFacetFilter, over the dataset's FacetIndex.
+    The date range is a contiguous slice of the time-sorted frame; each
+    selection is the OR of its values' bitmaps, and result() ANDs them and
+    does a single take.
+    """
+
+    def __init__(self, index, df, time_index, start_date, end_date):
+        self.index = index
+        self.df = df
+        self.lo, self.hi = date_bounds(time_index, start_date, end_date)
+        self.bitmaps = {}
+
+    def facet_counts(self, columns):
+        masks = {column: self.index.unpack(bitmap, self.lo, self.hi) for column, bitmap in self.bitmaps.items()}
+        return {
+            column: self.index.counts(column, rows + self.lo)
+            for column, rows in facet_rows(masks, self.hi - self.lo, columns)
+        }
+
+    def isin(self, column, values):
+        selected = self.index.bitmap(column, values)
+        if column in self.bitmaps:
+            np.bitwise_and(self.bitmaps[column], selected, out=selected)
+        self.bitmaps[column] = selected
+
+    def result(self):
+        if not self.bitmaps:
+            return self.df.iloc[self.lo:self.hi]
+        bitmap = np.bitwise_and.reduce(list(self.bitmaps.values()))
+        return self.df.take(np.flatnonzero(self.index.unpack(bitmap, self.lo, self.hi)) + self.lo)
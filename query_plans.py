@@ -0,0 +1,280 @@
+"""
+EXPLAIN (ANALYZE, BUFFERS) diagnostics for the warehouse load.
+
+run_diagnostics() analyzes the findings load query, the fingerprint query and
+every dimension join of FINDINGS_QUERY on its own. It flags sequential scans,
+hash joins and sorts that spill to disk, and the UPPER() join on dim_tempat,
+then compares each plan with the previous stored run of the same query.
+Plans are kept in public.dashboard_query_plans (migrations/003_query_plans.sql).
+
+    python cli.py explain
+
+The Diagnostik page goes through run_diagnostics_once(), which allows one
+run at a time per process and none within a cooldown of the previous one.
+"""
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+from utils import FINDINGS_QUERY, _fetch_one, db_connection, resolve_findings_source, star_join_queries
+
+logger = logging.getLogger(__name__)
+
+PLANS_TABLE = "public.dashboard_query_plans"
+
+# Sequential scans reading at least this many rows are reported as warnings.
+SEQ_SCAN_WARN_ROWS = 10000
+# A query this many times slower than its previous run is reported as a regression.
+SLOWDOWN_FACTOR = 1.5
+
+_JOIN_RE = re.compile(r"LEFT JOIN\s+(\S+)\s+(\w+)\s+ON\s+(.+?)\s*(?:--.*)?$", re.MULTILINE)
+_CONDITION_KEYS = ("Hash Cond", "Merge Cond", "Join Filter", "Index Cond", "Recheck Cond")
+
+
+def dimension_joins():
+    """(table, alias, condition) for each LEFT JOIN in FINDINGS_QUERY."""
+    return _JOIN_RE.findall(FINDINGS_QUERY)
+
+
+def plan_targets(raw_conn):
+    """Returns (source, [(query_name, sql), ...]) for the queries to analyze."""
+    source, query, fingerprint_query = resolve_findings_source(raw_conn)
+    targets = [("load", query), ("fingerprint", fingerprint_query)]
+    if source == "flat":
+        # The materialized table is rebuilt from the star join, so keep watching it.
+        targets.append(("star_join", star_join_queries(raw_conn)[0]))
+    for table, alias, condition in dimension_joins():
+        # Selecting the dimension's columns keeps the planner from removing the join.
+        targets.append((f"join:{table.split('.')[-1]}",
+                        f"SELECT f.kode_temuan, {alias}.* FROM public.fact_k3 f "
+                        f"LEFT JOIN {table} {alias} ON {condition}"))
+    return source, targets
+
+
+def explain(raw_conn, sql):
+    """Runs EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) and returns the plan document."""
+    cur = raw_conn.cursor()
+    try:
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+        doc = cur.fetchone()[0]
+    finally:
+        cur.close()
+    if isinstance(doc, str):
+        doc = json.loads(doc)
+    return doc[0]
+
+
+def _walk(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+
+def _signature(plan):
+    """Node types and relations in plan order; a change means Postgres picked a different plan."""
+    return [
+        "/".join(filter(None, (n["Node Type"], n.get("Relation Name"), n.get("Index Name"))))
+        for n in _walk(plan["Plan"])
+    ]
+
+
+def analyze_plan(plan):
+    """Flags for one EXPLAIN document: seq scans, disk spills and UPPER() joins."""
+    flags = []
+    for node in _walk(plan["Plan"]):
+        node_type = node["Node Type"]
+        relation = node.get("Relation Name")
+        rows = node.get("Actual Rows", 0) * node.get("Actual Loops", 1)
+
+        if node_type == "Seq Scan":
+            flags.append({
+                "kind": "seq_scan", "relation": relation,
+                "severity": "warning" if rows >= SEQ_SCAN_WARN_ROWS else "info",
+                "detail": f"Seq Scan on {relation}: {rows} rows in {node.get('Actual Loops', 1)} loop(s)",
+            })
+        if node_type == "Hash" and node.get("Hash Batches", 1) > 1:
+            flags.append({
+                "kind": "hash_spill", "relation": relation, "severity": "warning",
+                "detail": f"Hash spilled to disk: {node['Hash Batches']} batches "
+                          f"(planned {node.get('Original Hash Batches', 1)}), "
+                          f"{node.get('Peak Memory Usage', '?')} kB peak",
+            })
+        if node.get("Sort Space Type") == "Disk":
+            flags.append({
+                "kind": "sort_spill", "relation": relation, "severity": "warning",
+                "detail": f"Sort spilled to disk: {node.get('Sort Space Used', '?')} kB",
+            })
+        for key in _CONDITION_KEYS:
+            condition = node.get(key, "")
+            if "upper(" in condition.lower():
+                # Served by the expression index from 001 it is fine; anything else hashes every row.
+                indexed = key == "Index Cond"
+                flags.append({
+                    "kind": "upper_join", "relation": relation,
+                    "severity": "info" if indexed else "warning",
+                    "detail": f"{node_type} {key}: {condition}"
+                              + (" (expression index)" if indexed else " (not index-assisted)"),
+                })
+    return flags
+
+
+def _previous_runs(raw_conn):
+    """Latest stored (execution_ms, signature) per query name, or None when the table is missing."""
+    if not _fetch_one(raw_conn, "SELECT to_regclass(%s)", (PLANS_TABLE,))[0]:
+        return None
+    cur = raw_conn.cursor()
+    try:
+        cur.execute(f"""
+            SELECT DISTINCT ON (query_name) query_name, execution_ms, plan
+            FROM {PLANS_TABLE}
+            ORDER BY query_name, captured_at DESC
+        """)
+        return {name: (ms, _signature(plan if isinstance(plan, dict) else json.loads(plan)))
+                for name, ms, plan in cur.fetchall()}
+    finally:
+        cur.close()
+
+
+def _compare(result, previous):
+    if previous is None:
+        return []
+    prev_ms, prev_signature = previous
+    flags = []
+    if prev_ms and result["execution_ms"] > prev_ms * SLOWDOWN_FACTOR:
+        flags.append({
+            "kind": "slower", "relation": None, "severity": "warning",
+            "detail": f"Execution {result['execution_ms']:.0f} ms vs {prev_ms:.0f} ms last run",
+        })
+    if _signature(result["plan"]) != prev_signature:
+        flags.append({"kind": "plan_changed", "relation": None, "severity": "warning",
+                      "detail": "Plan shape differs from the last stored run"})
+    return flags
+
+
+def run_diagnostics(engine=None, store=True):
+    """
+    Analyzes every plan target. Returns (results, stored) where results is a
+    list of dicts (query_name, sql, planning_ms, execution_ms, actual_rows,
+    flags, plan) and stored tells whether they were saved to PLANS_TABLE.
+    EXPLAIN ANALYZE executes the queries, so this costs about one full load.
+    """
+    run_id = uuid.uuid4().hex
+    captured_at = datetime.now()
+    results = []
+    with db_connection(engine) as conn:
+        raw_conn = conn.connection
+        source, targets = plan_targets(raw_conn)
+        previous = _previous_runs(raw_conn)
+        for name, sql in targets:
+            try:
+                plan = explain(raw_conn, sql)
+            except Exception as e:
+                # e.g. statement_timeout; keep going so the other plans are still captured.
+                raw_conn.rollback()
+                logger.warning("EXPLAIN of %s failed: %s", name, e)
+                results.append({"run_id": run_id, "captured_at": captured_at, "query_name": name,
+                                "source": source, "sql": sql, "error": str(e), "flags": []})
+                continue
+            result = {
+                "run_id": run_id,
+                "captured_at": captured_at,
+                "query_name": name,
+                "source": source,
+                "sql": sql,
+                "planning_ms": plan.get("Planning Time"),
+                "execution_ms": plan.get("Execution Time"),
+                "actual_rows": plan["Plan"].get("Actual Rows"),
+                "plan": plan,
+            }
+            result["flags"] = analyze_plan(plan) + _compare(result, (previous or {}).get(name))
+            results.append(result)
+        raw_conn.rollback()
+
+        stored = store and previous is not None
+        if stored:
+            cur = raw_conn.cursor()
+            try:
+                for r in results:
+                    if "error" in r:
+                        continue
+                    cur.execute(
+                        f"INSERT INTO {PLANS_TABLE} (run_id, captured_at, query_name, source, planning_ms, "
+                        "execution_ms, actual_rows, flags, plan) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                        (run_id, captured_at, r["query_name"], source, r["planning_ms"], r["execution_ms"],
+                         r["actual_rows"], json.dumps(r["flags"]), json.dumps(r["plan"])),
+                    )
+                raw_conn.commit()
+            finally:
+                cur.close()
+    return results, stored
+
+
+class DiagnosticsBusy(RuntimeError):
+    """A run is in progress (retry_after None) or the cooldown has `retry_after` seconds left."""
+
+    def __init__(self, retry_after=None):
+        super().__init__("diagnostics already running" if retry_after is None
+                         else f"diagnostics cooling down, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+_run_lock = threading.Lock()
+_last_started = None
+
+
+def run_diagnostics_once(cooldown_seconds, engine=None, store=True):
+    """
+    run_diagnostics() for the dashboard: raises DiagnosticsBusy instead of
+    starting while another session's run is in progress or within
+    `cooldown_seconds` of the previous start (failed runs included).
+    """
+    global _last_started
+    if not _run_lock.acquire(blocking=False):
+        raise DiagnosticsBusy()
+    try:
+        now = time.monotonic()
+        if _last_started is not None and now - _last_started < cooldown_seconds:
+            raise DiagnosticsBusy(cooldown_seconds - (now - _last_started))
+        _last_started = now
+        return run_diagnostics(engine, store=store)
+    finally:
+        _run_lock.release()
+
+
+def plan_history(engine=None, limit=500):
+    """Stored runs, newest first: captured_at, query_name, timings and flag counts."""
+    with db_connection(engine) as conn:
+        raw_conn = conn.connection
+        if not _fetch_one(raw_conn, "SELECT to_regclass(%s)", (PLANS_TABLE,))[0]:
+            return pd.DataFrame()
+        return pd.read_sql(f"""
+            SELECT run_id, captured_at, query_name, source, planning_ms, execution_ms, actual_rows,
+                   jsonb_array_length(flags) AS flag_count,
+                   (SELECT COUNT(*) FROM jsonb_array_elements(flags) e
+                    WHERE e->>'severity' = 'warning') AS warning_count
+            FROM {PLANS_TABLE}
+            ORDER BY captured_at DESC
+            LIMIT %(limit)s
+        """, raw_conn, params={"limit": limit})
+
+
+def stored_run(run_id, engine=None):
+    """All plans of one stored run, in the same shape as run_diagnostics() results."""
+    with db_connection(engine) as conn:
+        raw_conn = conn.connection
+        cur = raw_conn.cursor()
+        try:
+            cur.execute(f"""
+                SELECT run_id, captured_at, query_name, source, planning_ms, execution_ms, actual_rows, flags, plan
+                FROM {PLANS_TABLE} WHERE run_id = %s ORDER BY id
+            """, (run_id,))
+            columns = [d[0] for d in cur.description]
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
+        finally:
+            cur.close()
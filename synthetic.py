@@ -0,0 +1,230 @@
+"""
+Synthetic HSSE findings in the warehouse star schema (see DDL.md).
+
+generate_star_schema() builds fact_k3, its dimensions and the five date
+dimensions as DataFrames, with the skew seen in production: a few
+categories, locations and reporters account for most findings, some
+tempat_id values differ in case from dim_tempat or have no match, and a
+share of locations has no coordinates (lat/long = 0).
+
+The tables can be loaded into a SQLite file (attached as schema "public",
+so FINDINGS_QUERY runs unchanged) or into a scratch Postgres database.
+"""
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+CATEGORY_WEIGHTS = {'Unsafe Condition': 0.45, 'Unsafe Action': 0.25, 'Positive': 0.2, 'Near Miss': 0.1}
+STATUS_WEIGHTS = {'Closed': 0.62, 'Open': 0.28, 'Butuh Verifikasi': 0.1}
+# Raw spellings as they arrive from the source app; normalize_findings() folds them.
+STATUS_SPELLINGS = {'Closed': ['Closed', 'CLOSED', 'closed '], 'Open': ['Open', 'OPEN', 'open'],
+                    'Butuh Verifikasi': ['Butuh Verifikasi', 'BUTUH VERIFIKASI']}
+OBJECTS = ['kabel', 'apar', 'tangga', 'pagar', 'helm', 'scaffolding', 'panel', 'pipa', 'lantai', 'rambu']
+CONDITIONS = ['rusak', 'kotor', 'hilang', 'bocor', 'longgar', 'terbuka', 'kadaluarsa', 'tidak standar']
+DEPARTMENTS = ['Operasi', 'Pemeliharaan', 'K3', 'Lingkungan', 'Engineering', 'Keamanan', 'Logistik', 'SDM']
+ROLES = ['Staff', 'Supervisor', 'Manager', 'Kontraktor']
+DISTRICTS = ['Tarahan', 'Sebalang', 'Bandar Lampung', 'Metro']
+DATE_TABLES = {
+    'dim_create_date': 'tanggal', 'dim_close_date': 'close_at', 'dim_open_date': 'open_at',
+    'dim_update_date': 'update_at', 'dim_target_date': 'target_at',
+}
+
+# Plant site centre; locations are scattered a few hundred metres around it.
+SITE_LAT, SITE_LON = -5.585, 105.387
+
+
+def _zipf_weights(n, s=1.1):
+    w = 1.0 / np.arange(1, n + 1) ** s
+    return w / w.sum()
+
+
+def _labels(prefix, n, width):
+    return np.array([f"{prefix}{i:0{width}d}" for i in range(n)], dtype=object)
+
+
+def _date_dimension(kode, ts, int_parts=False):
+    """Date dimension rows for the non-null timestamps in `ts` (as the ETL writes them)."""
+    has = ts.notna()
+    ts = ts[has]
+    parts = {p: getattr(ts.dt, p) for p in ('day', 'month', 'year')}
+    parts['hours'] = ts.dt.hour
+    parts['minutes'] = ts.dt.minute
+    df = pd.DataFrame({'kode_temuan': kode[has.to_numpy()]})
+    for name, values in parts.items():
+        df[name] = values.to_numpy().astype('int32' if int_parts else 'float64')
+    df['day_name'] = ts.dt.day_name().to_numpy()
+    df['ts'] = ts.to_numpy()
+    return df
+
+
+def generate_star_schema(n_findings, seed=0, end=pd.Timestamp('2025-12-31'), years=3):
+    """
+    Returns {table_name: DataFrame} for `n_findings` findings created over
+    the `years` before `end`. The dimension sizes grow with `n_findings`.
+    The same seed always gives the same tables.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(n_findings)
+    n_locations = int(np.clip(n // 250, 20, 2000))
+    n_creators = int(np.clip(n // 40, 20, 20000))
+
+    # --- Locations: skewed usage, ~5% without coordinates ---
+    loc_names = np.array([f"Area {i:04d}" for i in range(n_locations)], dtype=object)
+    lat = SITE_LAT + rng.normal(0, 0.002, n_locations)
+    lon = SITE_LON + rng.normal(0, 0.002, n_locations)
+    no_coords = rng.random(n_locations) < 0.05
+    lat[no_coords] = 0.0
+    lon[no_coords] = 0.0
+    dim_tempat = pd.DataFrame({
+        'nama_lokasi': loc_names, 'lat': lat, 'long': lon,
+        'zone': [f"Zona {chr(65 + i % 6)}" for i in range(n_locations)],
+    })
+    loc_idx = rng.choice(n_locations, n, p=_zipf_weights(n_locations))
+    tempat_id = loc_names[loc_idx]
+    # Free-text entries from the app: different case, or a place missing from dim_tempat.
+    upper = rng.random(n) < 0.15
+    tempat_id[upper] = np.char.upper(tempat_id[upper].astype(str))
+    unknown = rng.random(n) < 0.02
+    tempat_id[unknown] = np.array([f"Lokasi lain {i}" for i in rng.integers(0, 50, unknown.sum())], dtype=object)
+
+    # --- Reporters: a small core files most findings ---
+    creator_ids = _labels("C", n_creators, 6)
+    dim_creator = pd.DataFrame({
+        'creator_id': creator_ids,
+        'creator_name': [f"Pelapor {i}" for i in range(n_creators)],
+        'creator_kode_jabatan': rng.choice(['J1', 'J2', 'J3', 'J4'], n_creators),
+        'nama_perusahaan': rng.choice(['PLN', 'Mitra A', 'Mitra B'], n_creators, p=[0.7, 0.2, 0.1]),
+        'creator_role': rng.choice(ROLES, n_creators, p=[0.6, 0.25, 0.05, 0.1]),
+        'creator_departemen': rng.choice(DEPARTMENTS, n_creators, p=_zipf_weights(len(DEPARTMENTS), 0.8)),
+    })
+    dim_creator['creator_departemen_dan_role'] = dim_creator['creator_departemen'] + ' - ' + dim_creator['creator_role']
+    creator_id = creator_ids[rng.choice(n_creators, n, p=_zipf_weights(n_creators, 0.9))]
+
+    dim_distrik = pd.DataFrame({
+        'distrik_id': _labels("D", len(DISTRICTS), 2),
+        'creator_nama_distrik': DISTRICTS,
+        'temuan_kode_distrik': [d[:3].upper() for d in DISTRICTS],
+        'temuan_nama_distrik': DISTRICTS,
+    })
+
+    kode = _labels("TMN-", n, 7)
+    fact_k3 = pd.DataFrame({
+        'kode_temuan': kode,
+        'creator_id': creator_id,
+        'tempat_id': tempat_id,
+        'distrik_id': dim_distrik['distrik_id'].to_numpy()[rng.choice(len(DISTRICTS), n, p=[0.7, 0.1, 0.1, 0.1])],
+    })
+
+    # --- Findings ---
+    category = rng.choice(list(CATEGORY_WEIGHTS), n, p=list(CATEGORY_WEIGHTS.values()))
+    status = rng.choice(list(STATUS_WEIGHTS), n, p=list(STATUS_WEIGHTS.values()))
+    raw_status = status.astype(object)
+    for canonical, spellings in STATUS_SPELLINGS.items():
+        mask = status == canonical
+        raw_status[mask] = rng.choice(spellings, mask.sum(), p=[0.9] + [0.1 / (len(spellings) - 1)] * (len(spellings) - 1))
+    objects = np.array([f"{o} {c}" for o in OBJECTS for c in CONDITIONS], dtype=object)
+    obj = objects[rng.choice(len(objects), n, p=_zipf_weights(len(objects)))]
+    condition = rng.choice(CONDITIONS, n)
+    dim_temuan = pd.DataFrame({
+        'kode_temuan': kode,
+        'raw_judul': obj,
+        'raw_kondisi': condition,
+        'raw_rekomendasi': 'Segera ditindaklanjuti',
+        'temuan_nama': obj,
+        'temuan_kondisi': condition,
+        'temuan_rekomendasi': 'Perbaiki sesuai standar',
+        'temuan_kategori': category,
+        'note': None,
+        'keterangan_lokasi': None,
+        'temuan_status': raw_status,
+        'temuan_nama_spesifik': obj,
+    })
+
+    dim_pic = pd.DataFrame({
+        'kode_temuan': kode,
+        'pic_id': rng.choice(creator_ids, n),
+        'pic_name': [f"Pelapor {i}" for i in rng.integers(0, n_creators, n)],
+        'pic_departemen': rng.choice(DEPARTMENTS, n),
+    })
+
+    # --- Dates: more findings in recent months, closed ones get a close date ---
+    span_minutes = int(years * 365 * 24 * 60)
+    age = (rng.beta(1.0, 1.4, n) * span_minutes).astype(np.int64)
+    created = pd.Series(end - pd.to_timedelta(age, unit='min')).dt.floor('min')
+    closed = status == 'Closed'
+    close_at = created + pd.to_timedelta(rng.exponential(9 * 24 * 60, n).astype(np.int64), unit='min')
+    close_at = close_at.where(closed)
+    update_at = close_at.where(closed, created + pd.to_timedelta(rng.exponential(4 * 24 * 60, n).astype(np.int64), unit='min'))
+    target_at = created + pd.to_timedelta(rng.choice([7, 14, 30], n), unit='D')
+    timestamps = {'tanggal': created, 'close_at': close_at, 'open_at': created, 'update_at': update_at, 'target_at': target_at}
+
+    tables = {
+        'fact_k3': fact_k3, 'dim_temuan': dim_temuan, 'dim_creator': dim_creator, 'dim_distrik': dim_distrik,
+        'dim_pic': dim_pic, 'dim_tempat': dim_tempat,
+    }
+    for table, column in DATE_TABLES.items():
+        tables[table] = _date_dimension(kode, timestamps[column], int_parts=(table == 'dim_create_date'))
+    return tables
+
+
+# Keys and join indexes the warehouse has (DDL.md, migrations/), so the stand-in plans comparably.
+INDEXES = [
+    "CREATE UNIQUE INDEX fact_k3_pkey ON {schema}fact_k3 (kode_temuan)",
+    "CREATE INDEX fact_k3_tempat_upper ON {schema}fact_k3 (UPPER(tempat_id))",
+    "CREATE UNIQUE INDEX dim_temuan_pkey ON {schema}dim_temuan (kode_temuan)",
+    "CREATE UNIQUE INDEX dim_creator_pkey ON {schema}dim_creator (creator_id)",
+    "CREATE UNIQUE INDEX dim_pic_pkey ON {schema}dim_pic (kode_temuan)",
+    "CREATE INDEX dim_tempat_upper ON {schema}dim_tempat (UPPER(nama_lokasi))",
+] + [f"CREATE UNIQUE INDEX {t}_pkey ON {{schema}}{t} (kode_temuan)" for t in DATE_TABLES]
+
+
+def connect_sqlite(path):
+    """Opens the SQLite stand-in with the tables visible as `public.<table>`, like the warehouse."""
+    con = sqlite3.connect(":memory:")
+    con.execute("ATTACH DATABASE ? AS public", (path,))
+    return con
+
+
+def load_sqlite(tables, path):
+    """Writes the tables into the SQLite file at `path`, replacing existing ones."""
+    con = sqlite3.connect(path)
+    try:
+        for name, df in tables.items():
+            frame = df.copy()
+            for col in frame.select_dtypes(include=['datetime64']).columns:
+                frame[col] = frame[col].dt.strftime('%Y-%m-%d %H:%M:%S')
+            frame.to_sql(name, con, if_exists='replace', index=False, chunksize=50000)
+        for ddl in INDEXES:
+            con.execute(ddl.format(schema=""))
+        con.commit()
+    finally:
+        con.close()
+
+
+def _copy_from(table, conn, keys, data_iter):
+    """pandas.to_sql insert method that streams rows through Postgres COPY."""
+    import csv
+    import io
+
+    buf = io.StringIO()
+    csv.writer(buf).writerows(data_iter)
+    buf.seek(0)
+    columns = ", ".join(f'"{k}"' for k in keys)
+    name = f"{table.schema}.{table.name}" if table.schema else table.name
+    with conn.connection.cursor() as cur:
+        cur.copy_expert(f"COPY {name} ({columns}) FROM STDIN WITH CSV", buf)
+
+
+def load_postgres(tables, engine):
+    """
+    Writes the tables into schema public of `engine`'s database, replacing
+    existing ones. Point it at a scratch database, never the warehouse.
+    """
+    with engine.begin() as conn:
+        for name, df in tables.items():
+            df.head(0).to_sql(name, conn, schema='public', if_exists='replace', index=False)
+            df.to_sql(name, conn, schema='public', if_exists='append', index=False, method=_copy_from)
+        for ddl in INDEXES:
+            conn.exec_driver_sql(ddl.format(schema="public."))
+        conn.exec_driver_sql("ANALYZE")
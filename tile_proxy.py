@@ -0,0 +1,216 @@
+"""
+Caching proxy for the satellite basemap tiles.
+
+The plant footprint is small and fixed, so the handful of tiles the maps
+ever show can live on local disk instead of crossing the plant's slow link
+on every page view. The proxy serves `/tiles/{z}/{x}/{y}{r}.jpg` from the
+cache directory and fetches misses from the upstream tile server, adding
+the API key on the server side, so it never reaches the browser. Only
+tiles within the plant footprint (the zoom range and area of
+`tiles_around()`) are fetched; other misses get a 404, so the key's quota
+can't be spent on the rest of the world:
+
+    [tiles]
+    url = "http://<proxy-host>:8601/tiles/{z}/{x}/{y}{r}.jpg"   # what the maps request
+    upstream = "https://tiles.stadiamaps.com/tiles/alidade_satellite/{z}/{x}/{y}{r}.jpg?api_key={api_key}"
+    cache_dir = ".cache/tiles"
+    radius_m = 1500            # footprint around the plant fetched from upstream
+    min_zoom = 15
+    max_zoom = 19
+
+    python cli.py tiles serve   # run the proxy
+    python cli.py tiles seed    # pre-fetch zoom 15-19 around the plant
+
+Only the standard library is used; any HTTP server with the same URL layout
+(e.g. `python -m http.server` over a directory of tiles) can stand in for
+the upstream in tests.
+"""
+import logging
+import math
+import os
+import re
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UPSTREAM = "https://tiles.stadiamaps.com/tiles/alidade_satellite/{z}/{x}/{y}{r}.jpg?api_key={api_key}"
+DEFAULT_CACHE_DIR = os.path.join(".cache", "tiles")
+DEFAULT_PORT = 8601
+DEFAULT_RADIUS_M = 1500
+
+# Map center of every page (PLTU Sebalang) and the zoom levels worth seeding.
+PLANT_CENTER = (-5.585357333271365, 105.38785245329919)
+SEED_ZOOMS = range(15, 20)
+
+_TILE_PATH = re.compile(r"^/tiles/(\d{1,2})/(\d+)/(\d+)(@2x)?\.jpg$")
+
+
+class OutsideFootprint(LookupError):
+    """A tile that is not cached lies outside the area the proxy may fetch from upstream."""
+
+
+class TileCache:
+    """
+    Tiles on disk under `cache_dir`, fetched from `upstream` on a miss.
+    With a `footprint` (see footprint()) only misses inside it are fetched;
+    cached tiles are served wherever they are.
+    """
+
+    def __init__(self, upstream=DEFAULT_UPSTREAM, api_key="", cache_dir=DEFAULT_CACHE_DIR, timeout=15,
+                 footprint=None):
+        self.upstream = upstream
+        self.api_key = api_key or ""
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.footprint = footprint
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.refused = 0
+
+    def path(self, z, x, y, retina=False):
+        return os.path.join(self.cache_dir, str(z), str(x), f"{y}{'@2x' if retina else ''}.jpg")
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def allows(self, z, x, y):
+        """Whether a missing tile may be fetched from upstream."""
+        if self.footprint is None:
+            return True
+        bounds = self.footprint.get(z)
+        return bounds is not None and bounds[0] <= x <= bounds[1] and bounds[2] <= y <= bounds[3]
+
+    def get(self, z, x, y, retina=False):
+        """
+        The tile's bytes, from disk or else from upstream (then stored).
+        Raises OutsideFootprint for a missing tile outside the footprint, and
+        on upstream failure.
+        """
+        path = self.path(z, x, y, retina)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            self._count("hits")
+            return data
+        except FileNotFoundError:
+            pass
+
+        if not self.allows(z, x, y):
+            self._count("refused")
+            raise OutsideFootprint(f"{z}/{x}/{y}")
+        self._count("misses")
+        url = self.upstream.format(z=z, x=x, y=y, r="@2x" if retina else "", api_key=self.api_key)
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                data = response.read()
+        except (urllib.error.URLError, OSError):
+            self._count("errors")
+            raise
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename, so a concurrent reader never sees a partial tile.
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return data
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "errors": self.errors, "refused": self.refused}
+
+
+def tile_xy(lat, lon, z):
+    """Slippy-map tile column and row containing (lat, lon) at zoom `z`."""
+    n = 2 ** z
+    x = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def footprint(center=PLANT_CENTER, radius_m=DEFAULT_RADIUS_M, zooms=SEED_ZOOMS):
+    """{z: (x0, x1, y0, y1)}: the tile ranges covering the square of +-`radius_m` around `center`."""
+    lat, lon = center
+    dlat = radius_m / 111_320.0
+    dlon = radius_m / (111_320.0 * math.cos(math.radians(lat)))
+    bounds = {}
+    for z in zooms:
+        x0, y0 = tile_xy(lat + dlat, lon - dlon, z)
+        x1, y1 = tile_xy(lat - dlat, lon + dlon, z)
+        bounds[z] = (x0, x1, y0, y1)
+    return bounds
+
+
+def tiles_around(center=PLANT_CENTER, radius_m=DEFAULT_RADIUS_M, zooms=SEED_ZOOMS):
+    """Every (z, x, y) of footprint(center, radius_m, zooms)."""
+    for z, (x0, x1, y0, y1) in footprint(center, radius_m, zooms).items():
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield z, x, y
+
+
+def seed(cache, tiles, retina=False, workers=4):
+    """Fetches every tile in `tiles` not yet on disk. Returns (already cached, fetched, failed)."""
+    tiles = list(tiles)
+    missing = [t for t in tiles if not os.path.exists(cache.path(*t, retina=retina))]
+
+    def fetch(tile):
+        try:
+            cache.get(*tile, retina=retina)
+            return True
+        except (urllib.error.URLError, OSError, OutsideFootprint) as e:
+            logger.warning("Tile %s/%s/%s failed: %s", *tile, e)
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        fetched = sum(pool.map(fetch, missing))
+    return len(tiles) - len(missing), fetched, len(missing) - fetched
+
+
+class _TileHandler(BaseHTTPRequestHandler):
+    cache = None
+    max_age = 7 * 24 * 3600
+
+    def do_GET(self):
+        match = _TILE_PATH.match(self.path.split("?", 1)[0])
+        if not match:
+            self.send_error(404)
+            return
+        z, x, y = (int(v) for v in match.groups()[:3])
+        if x >= 2 ** z or y >= 2 ** z:
+            self.send_error(404)
+            return
+        try:
+            data = self.cache.get(z, x, y, retina=bool(match.group(4)))
+        except OutsideFootprint:
+            self.send_error(404)
+            return
+        except urllib.error.HTTPError as e:
+            self.send_error(e.code if 400 <= e.code < 500 else 502)
+            return
+        except (urllib.error.URLError, OSError):
+            self.send_error(502)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", f"public, max-age={self.max_age}")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("%s " + format, self.address_string(), *args)
+
+
+def make_server(cache, host="0.0.0.0", port=DEFAULT_PORT):
+    """A threaded HTTP server answering tile requests from `cache` (call serve_forever())."""
+    handler = type("TileHandler", (_TileHandler,), {"cache": cache})
+    return ThreadingHTTPServer((host, port), handler)
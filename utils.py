@@ -1,12 +1,39 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
 import os
+import logging
+import threading
+import resource
+import json
+import re
+import time
 from sqlalchemy import create_engine, text
-from datetime import datetime
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+from contextlib import contextmanager
+from datetime import datetime, date
+from typing import NamedTuple, Optional, Tuple
 from constants import flat_colors, HSE_COLOR_MAP
+from cube import build_cube, update_cube
+from query_engine import (
+    BitmapFacetFilter, DuckDBFacetFilter, FacetIndex, PandasFacetFilter, date_bounds, get_duckdb_connection,
+)
+from perf import instrument, render_panel, start_run, timed
+from view_cache import CachedFacetFilter, get_map_cache, get_view_cache
+from tile_proxy import DEFAULT_UPSTREAM
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
 
+logger = logging.getLogger(__name__)
+
+# The shared findings dataset is handed out by reference; copy-on-write makes
+# any in-page modification copy instead of writing into the shared buffers.
+# (Always on from pandas 3.0.)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+@instrument("render_wordcloud")
 def render_wordcloud(frequency_dict, color_scheme='blue', title=""):
     if not frequency_dict:
         st.info("Tidak ada data untuk wordcloud")
@@ -50,86 +77,134 @@ def hex_to_rgba(hex_color, opacity=0.4):
 
 
 # --- DATABASE CONNECTION ---
+def get_config(section, key, default=None):
+    """
+    Reads an optional setting from .streamlit/secrets.toml,
+    falling back to `default` when the section or key is missing.
+    """
+    try:
+        return st.secrets.get(section, {}).get(key, default)
+    except Exception:
+        return default
+
+@st.cache_resource
+def _engine_registry(db_url, pool_size, max_overflow, pool_recycle, pool_timeout, statement_timeout_ms):
+    """
+    One engine (and therefore one connection pool) per distinct configuration,
+    shared by every session and thread in the process.
+    """
+    engine = create_engine(
+        db_url,
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=pool_recycle,
+        pool_timeout=pool_timeout,
+        pool_pre_ping=True,
+        connect_args={"options": f"-c statement_timeout={statement_timeout_ms}", "connect_timeout": 10},
+    )
+    engine.pool_waits = {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "retries": 0,
+                         "lock": threading.Lock()}
+    return engine
+
 def get_db_engine():
     """
     Establishes a connection to the PostgreSQL Data Warehouse
-    using credentials stored in .streamlit/secrets.toml
+    using credentials stored in .streamlit/secrets.toml.
+    Returns the process-wide pooled engine; pool sizing comes from `[pool]`.
+    Raises RuntimeError when the `[postgres]` credentials are missing.
     """
     try:
-        if "postgres" in st.secrets:
-            db_config = st.secrets["postgres"]
-            db_url = f"postgresql+psycopg2://{db_config['user']}:{db_config['password']}@{db_config['host']}:{db_config['port']}/{db_config['dbname']}"
-        else:
-            db_url = ""
-        engine = create_engine(db_url)
-        return engine
-    except Exception as e:
-        st.error(f"Failed to configure database engine: {e}")
-        return None
+        db_config = st.secrets["postgres"]
+    except Exception:
+        # No secrets file at all, or no [postgres] section in it.
+        raise RuntimeError("PostgreSQL credentials missing: add a [postgres] section to .streamlit/secrets.toml") from None
+    db_url = f"postgresql+psycopg2://{db_config['user']}:{db_config['password']}@{db_config['host']}:{db_config['port']}/{db_config['dbname']}"
+    return _engine_registry(
+        db_url,
+        pool_size=int(get_config("pool", "size", 5)),
+        max_overflow=int(get_config("pool", "max_overflow", 10)),
+        pool_recycle=int(get_config("pool", "recycle_seconds", 1800)),
+        pool_timeout=int(get_config("pool", "timeout_seconds", 30)),
+        statement_timeout_ms=int(get_config("pool", "statement_timeout_ms", 300000)),
+    )
 
-@st.cache_data(ttl=3600)
-def load_data():
+@contextmanager
+def db_connection(engine=None):
     """
-    Loads data from the PostgreSQL Data Warehouse and preprocesses it 
-    to match the legacy CSV format expected by the Streamlit app.
+    Checks a connection out of the shared pool, retrying transient connection
+    failures `[pool] retries` times with exponential backoff. Time spent
+    waiting for a connection is recorded for pool_status().
     """
+    engine = engine or get_db_engine()
+    retries = int(get_config("pool", "retries", 3))
+    backoff = float(get_config("pool", "retry_backoff_seconds", 0.5))
+    waits = engine.pool_waits
+
+    started = time.perf_counter()
+    attempt = 0
+    try:
+        while True:
+            try:
+                conn = engine.connect()
+                break
+            except OperationalError as e:
+                if attempt >= retries:
+                    raise
+                delay = backoff * 2 ** attempt
+                logger.warning("Database connection failed (attempt %d/%d), retrying in %.1fs: %s",
+                               attempt + 1, retries + 1, delay, e)
+                time.sleep(delay)
+                attempt += 1
+    finally:
+        waited = time.perf_counter() - started
+        with waits["lock"]:
+            waits["count"] += 1
+            waits["retries"] += attempt
+            waits["total_seconds"] += waited
+            waits["max_seconds"] = max(waits["max_seconds"], waited)
     try:
-        engine = get_db_engine()
-        if not engine:
-            return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-        query = """
+        yield conn
+    finally:
+        conn.close()
+
+def pool_status(engine=None):
+    """Connection pool pressure: checked-out/overflow counts and checkout wait times."""
+    engine = engine or get_db_engine()
+    pool = engine.pool
+    waits = engine.pool_waits
+    with waits["lock"]:
+        count = waits["count"]
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "checkouts": count,
+            "retries": waits["retries"],
+            "avg_wait_ms": round(waits["total_seconds"] / count * 1000, 1) if count else 0.0,
+            "max_wait_ms": round(waits["max_seconds"] * 1000, 1),
+        }
+
+FINDINGS_QUERY = """
 SELECT 
   -- Fact Table Keys
   f.kode_temuan, 
   -- Create Date (tanggal pembuatan)
-  CASE WHEN dd_create."year" IS NOT NULL THEN MAKE_TIMESTAMP(
-    CAST(dd_create."year" AS int), 
-    CAST(dd_create."month" AS int), 
-    CAST(dd_create."day" AS int), 
-    CAST(dd_create.hours AS int), 
-    CAST(dd_create.minutes AS int), 
-    0.0
-  ) ELSE NULL END AS tanggal, 
+  dd_create.ts AS tanggal, 
   dd_create.day_name AS create_day_name, 
   -- Close Date (tanggal penutupan)
-  CASE WHEN dd_close."year" IS NOT NULL THEN MAKE_TIMESTAMP(
-    CAST(dd_close."year" AS int), 
-    CAST(dd_close."month" AS int), 
-    CAST(dd_close."day" AS int), 
-    CAST(dd_close.hours AS int), 
-    CAST(dd_close.minutes AS int), 
-    0.0
-  ) ELSE NULL END AS close_at, 
+  dd_close.ts AS close_at, 
   dd_close.day_name AS close_day_name, 
   -- Open Date (tanggal dibuka)
-  CASE WHEN dd_open."year" IS NOT NULL THEN MAKE_TIMESTAMP(
-    CAST(dd_open."year" AS int), 
-    CAST(dd_open."month" AS int), 
-    CAST(dd_open."day" AS int), 
-    CAST(dd_open.hours AS int), 
-    CAST(dd_open.minutes AS int), 
-    0.0
-  ) ELSE NULL END AS open_at, 
+  dd_open.ts AS open_at, 
   dd_open.day_name AS open_day_name, 
   -- Update Date (tanggal update terakhir)
-  CASE WHEN dd_update."year" IS NOT NULL THEN MAKE_TIMESTAMP(
-    CAST(dd_update."year" AS int), 
-    CAST(dd_update."month" AS int), 
-    CAST(dd_update."day" AS int), 
-    CAST(dd_update.hours AS int), 
-    CAST(dd_update.minutes AS int), 
-    0.0
-  ) ELSE NULL END AS update_at, 
+  dd_update.ts AS update_at, 
   dd_update.day_name AS update_day_name, 
   -- Target Date (tanggal target penyelesaian)
-  CASE WHEN dd_target."year" IS NOT NULL THEN MAKE_TIMESTAMP(
-    CAST(dd_target."year" AS int), 
-    CAST(dd_target."month" AS int), 
-    CAST(dd_target."day" AS int), 
-    CAST(dd_target.hours AS int), 
-    CAST(dd_target.minutes AS int), 
-    0.0
-  ) ELSE NULL END AS target_at, 
+  dd_target.ts AS target_at, 
   dd_target.day_name AS target_day_name, 
   dc.creator_id, 
   dc.creator_name, 
@@ -167,21 +242,527 @@ FROM
   LEFT JOIN public.dim_open_date dd_open ON f.kode_temuan = dd_open.kode_temuan -- Update Date Dimension
   LEFT JOIN public.dim_update_date dd_update ON f.kode_temuan = dd_update.kode_temuan -- Target Date Dimension
   LEFT JOIN public.dim_target_date dd_target ON f.kode_temuan = dd_target.kode_temuan
-        """
-        
-        # Execute query using raw DBAPI connection for pandas compatibility
-        with engine.connect() as conn:
+"""
+
+# Materialized copy of FINDINGS_QUERY, created by migrations/001_findings_flat_view.sql.
+FLAT_TABLE = "public.mv_findings_flat"
+
+def _delta_query(source_query):
+    """Wraps a findings query so it only returns rows created or updated since the watermark."""
+    return f"""
+SELECT * FROM ({source_query}) q
+WHERE q.update_at >= %(watermark)s OR q.tanggal >= %(watermark)s
+"""
+
+# Cheap change detector: if neither the number of findings nor the latest
+# create/update timestamp moved, the cached frame is still current.
+FINGERPRINT_QUERY = """
+SELECT
+  COUNT(DISTINCT f.kode_temuan) AS row_count,
+  MAX(dd_create.ts) AS max_create_at,
+  MAX(dd_update.ts) AS max_update_at
+FROM
+  public.fact_k3 f
+  LEFT JOIN public.dim_create_date dd_create ON f.kode_temuan = dd_create.kode_temuan
+  LEFT JOIN public.dim_update_date dd_update ON f.kode_temuan = dd_update.kode_temuan
+"""
+
+FLAT_FINGERPRINT_QUERY = f"""
+SELECT COUNT(DISTINCT kode_temuan) AS row_count, MAX(tanggal) AS max_create_at, MAX(update_at) AS max_update_at
+FROM {FLAT_TABLE}
+"""
+
+# Date dimensions whose generated `ts` column (migrations/002) the queries above read.
+DATE_DIMENSIONS = ('dim_create_date', 'dim_close_date', 'dim_open_date', 'dim_update_date', 'dim_target_date')
+
+_TS_COLUMN_RE = re.compile(r"\b(dd_\w+)\.ts\b")
+
+def _derived_timestamps(query):
+    """`query` with every dd_*.ts rebuilt from the date parts, for dimensions without the ts column."""
+    return _TS_COLUMN_RE.sub(
+        lambda m: (f'CASE WHEN {m[1]}."year" IS NOT NULL THEN MAKE_TIMESTAMP('
+                   f'CAST({m[1]}."year" AS int), CAST({m[1]}."month" AS int), CAST({m[1]}."day" AS int), '
+                   f'CAST({m[1]}.hours AS int), CAST({m[1]}.minutes AS int), 0.0) ELSE NULL END'),
+        query,
+    )
+
+def star_join_queries(raw_conn):
+    """
+    (findings_query, fingerprint_query) over the star schema. They read the
+    generated dd_*.ts columns when every date dimension has one, and rebuild
+    the timestamps from the date parts otherwise (e.g. migration 002 not
+    applied yet, or the ETL recreated a dimension table without the column).
+    """
+    present = _fetch_one(raw_conn, """
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = 'public' AND column_name = 'ts' AND table_name = ANY(%s)
+    """, (list(DATE_DIMENSIONS),))[0]
+    if present == len(DATE_DIMENSIONS):
+        return FINDINGS_QUERY, FINGERPRINT_QUERY
+    logger.warning("Date dimensions lack the generated ts column (%s of %s present); "
+                   "deriving timestamps from the date parts. Re-apply migrations/002.",
+                   present, len(DATE_DIMENSIONS))
+    return _derived_timestamps(FINDINGS_QUERY), _derived_timestamps(FINGERPRINT_QUERY)
+
+# Sort key for missing dates: after every real timestamp, so NaT rows stay at the end.
+NAT_EPOCH = np.iinfo(np.int64).max
+
+def _epoch_ns(tanggal):
+    """`tanggal` as int64 nanoseconds since the epoch, NaT mapped to NAT_EPOCH."""
+    epoch = tanggal.to_numpy(dtype='datetime64[ns]').view('i8').copy()
+    epoch[tanggal.isna().to_numpy()] = NAT_EPOCH
+    return epoch
+
+def _is_sorted(epoch):
+    return len(epoch) < 2 or bool((epoch[1:] >= epoch[:-1]).all())
+
+def sort_by_time(df):
+    """Returns `df` ordered by `tanggal` (missing dates last) with a fresh RangeIndex."""
+    if 'tanggal' not in df.columns or _is_sorted(_epoch_ns(df['tanggal'])):
+        return df
+    return df.sort_values('tanggal', kind='stable', na_position='last', ignore_index=True)
+
+class FindingsDataset:
+    """
+    The one canonical, process-wide copy of the findings.
+
+    `exploded` and `map` are views over `master`, not copies. Every session
+    receives the same object; with pandas copy-on-write a page that modifies
+    a frame gets its own copy while the shared buffers stay untouched.
+
+    `master` is sorted by `tanggal` and `time_index` holds the matching int64
+    epoch array, so date ranges are found by binary search (see filter_by_date).
+    """
+
+    def __init__(self, master, version, loaded_at):
+        self.master = master
+        self.version = version
+        self.loaded_at = loaded_at
+        self.time_index = _epoch_ns(master['tanggal']) if 'tanggal' in master.columns else None
+        self._map = None
+        self._facet_index = None
+        self._cube = None
+        self._cube_time_index = None
+
+    @property
+    def exploded(self):
+        # One row per kode_temuan, so the legacy "exploded" frame is master itself.
+        return self.master
+
+    @property
+    def map(self):
+        if self._map is None:
+            self._map = self.master[['nama_lokasi', 'lat', 'lon']]
+        return self._map
+
+    @property
+    def facet_index(self):
+        # Built on first use; a new load publishes a new dataset and so a new index.
+        if self._facet_index is None:
+            self._facet_index = FacetIndex(self.master)
+        return self._facet_index
+
+    @property
+    def cube(self):
+        """Daily rollup of master (see cube.py); None unless master is one row per finding."""
+        if self._cube is None:
+            unique = 'tanggal' in self.master.columns and self.master['kode_temuan'].is_unique
+            self._cube = build_cube(self.master) if unique else False
+        return self._cube if self._cube is not False else None
+
+    @property
+    def cube_time_index(self):
+        # Epoch array of the cube's days, like time_index for master.
+        if self._cube_time_index is None and self.cube is not None:
+            self._cube_time_index = _epoch_ns(self.cube['tanggal'])
+        return self._cube_time_index
+
+@st.cache_resource
+def _findings_store():
+    """
+    Process-wide holder for the last loaded findings frame, shared by all
+    sessions so a refresh only has to fetch what changed since the last one.
+    """
+    return {"df": None, "dataset": None, "watermark": None, "fingerprint": None, "source": None,
+            "load_stats": None, "memory_report": None,
+            "origin": None, "loaded_at": None, "checked_at": None, "error": None, "refreshing": False,
+            "lock": threading.RLock()}
+
+def _publish_findings(store, df, changed=None, **fields):
+    """
+    Swaps a new findings frame into the store together with the shared dataset
+    built on it. Returns the published frame (sorted by `tanggal`).
+
+    `changed` lists the kode_temuan merged by an incremental refresh; the
+    previous dataset's rollup cube is then updated for just those findings.
+    """
+    df = sort_by_time(df)
+    previous = store["dataset"]
+    store.update(df=df, watermark=_watermark(df), **fields)
+    version = "|".join([store["source"] or "", *store["fingerprint"]])
+    dataset = FindingsDataset(df, version, store["loaded_at"])
+    if changed is not None and previous is not None and isinstance(previous._cube, pd.DataFrame) \
+            and df['kode_temuan'].is_unique:
+        dataset._cube = update_cube(previous._cube, previous.master, df, changed)
+    store["dataset"] = dataset
+    return df
+
+def _fetch_one(raw_conn, query, params=None):
+    cur = raw_conn.cursor()
+    try:
+        cur.execute(query, params)
+        return tuple(cur.fetchone())
+    finally:
+        cur.close()
+
+def resolve_findings_source(raw_conn):
+    """
+    Picks where findings are read from, per `[loader] source`:
+    "flat" reads the materialized table, "join" runs the full star join,
+    and "auto" (default) uses the flat table whenever it exists.
+    Returns (source_name, findings_query, fingerprint_query).
+    """
+    source = get_config("loader", "source", "auto")
+    if source == "auto":
+        source = "flat" if _fetch_one(raw_conn, "SELECT to_regclass(%s)", (FLAT_TABLE,))[0] else "join"
+    if source == "flat":
+        return "flat", f"SELECT * FROM {FLAT_TABLE}", FLAT_FINGERPRINT_QUERY
+    return ("join", *star_join_queries(raw_conn))
+
+def refresh_flat_table(engine):
+    """Refreshes the materialized findings table without blocking readers."""
+    with db_connection(engine) as conn:
+        with conn.begin():
+            conn.execute(text("SELECT public.refresh_findings_flat()"))
+
+TIMESTAMP_COLUMNS = ['tanggal', 'close_at', 'open_at', 'update_at', 'target_at']
+
+def _current_rss_mb():
+    """Resident set size of this process in MiB (Linux /proc, else peak RSS from getrusage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _coerce_chunk(chunk):
+    """Gives every chunk the same dtypes so concatenation never falls back to object columns."""
+    for col in TIMESTAMP_COLUMNS:
+        if col in chunk.columns:
+            chunk[col] = pd.to_datetime(chunk[col])
+    for col in ('lat', 'lon'):
+        if col in chunk.columns:
+            chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+    return chunk
+
+def _read_findings(raw_conn, query, params=None):
+    """
+    Runs a findings query and returns it as a DataFrame.
+
+    With `[loader] streaming` (default) rows are pulled through a named,
+    server-side cursor `[loader] chunk_size` rows at a time, and each chunk
+    is turned into a typed frame before the next fetch, so psycopg2 never
+    buffers the full result as Python tuples. Peak RSS is logged and kept
+    in the findings store's `load_stats` for container sizing.
+    """
+    rss_before = _current_rss_mb()
+    if not get_config("loader", "streaming", True):
+        df = _coerce_chunk(pd.read_sql(query, raw_conn, params=params))
+        n_chunks = 1
+        peak_rss = _current_rss_mb()
+    else:
+        chunk_size = int(get_config("loader", "chunk_size", 5000))
+        chunks = []
+        peak_rss = rss_before
+        cur = raw_conn.cursor(name="findings_stream")
+        cur.itersize = chunk_size
+        try:
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                columns = [d[0] for d in cur.description]
+                chunks.append(_coerce_chunk(pd.DataFrame.from_records(rows, columns=columns)))
+                del rows
+                peak_rss = max(peak_rss, _current_rss_mb())
+            columns = [d[0] for d in cur.description] if cur.description else []
+        finally:
+            cur.close()
+        n_chunks = len(chunks)
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+        del chunks
+        peak_rss = max(peak_rss, _current_rss_mb())
+
+    stats = {
+        "rows": len(df),
+        "chunks": n_chunks,
+        "rss_before_mb": round(rss_before, 1),
+        "peak_rss_mb": round(peak_rss, 1),
+    }
+    _findings_store()["load_stats"] = stats
+    logger.info("Loaded %d findings in %d chunk(s), peak RSS %.1f MiB (%.1f MiB before)",
+                stats["rows"], n_chunks, peak_rss, rss_before)
+    return df
+
+# Low-cardinality text columns stored as pandas categoricals, so sidebar
+# filters and page groupbys work on integer codes instead of Python strings.
+CATEGORICAL_COLUMNS = [
+    'temuan_kategori', 'temuan_status', 'creator_departemen', 'creator_role',
+    'nama_lokasi', 'zona', 'pic_departemen',
+    'create_day_name', 'close_day_name', 'open_day_name', 'update_day_name', 'target_day_name',
+]
+STATUS_CANONICAL = {
+    'open': 'Open',
+    'closed': 'Closed',
+    'butuh verifikasi': 'Butuh Verifikasi',
+}
+
+def normalize_findings(df):
+    """
+    Compacts the findings frame once at load time: canonical status spelling,
+    categorical dtype for CATEGORICAL_COLUMNS and float32 coordinates.
+    Returns (df, report) where report lists bytes before/after per column.
+    """
+    if df.empty:
+        return df, []
+
+    before = df.memory_usage(deep=True, index=False)
+    df = df.copy()
+
+    if 'temuan_status' in df.columns:
+        status = df['temuan_status'].astype('string').str.strip()
+        df['temuan_status'] = status.str.lower().map(STATUS_CANONICAL).fillna(status)
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in ('lat', 'lon'):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+
+    after = df.memory_usage(deep=True, index=False)
+    report = [
+        {"column": col, "before_bytes": int(before[col]), "after_bytes": int(after[col])}
+        for col in CATEGORICAL_COLUMNS + ['lat', 'lon'] if col in df.columns
+    ]
+    for row in report:
+        logger.info("dtype %s: %.1f KiB -> %.1f KiB", row["column"],
+                    row["before_bytes"] / 1024, row["after_bytes"] / 1024)
+    return df, report
+
+def _watermark(df):
+    """Latest create/update timestamp present in the frame, or None."""
+    if df.empty:
+        return None
+    latest = pd.concat([pd.to_datetime(df['tanggal']), pd.to_datetime(df['update_at'])]).max()
+    return None if pd.isnull(latest) else latest.to_pydatetime()
+
+def _upsert_findings(df, delta):
+    """Replaces rows of `df` whose kode_temuan appears in `delta` and appends new ones."""
+    if delta.empty:
+        return df
+    kept = df[~df['kode_temuan'].isin(delta['kode_temuan'])]
+    return pd.concat([kept, delta], ignore_index=True)
+
+def _sync_findings(engine):
+    """
+    Brings the shared findings frame up to date with the warehouse.
+
+    Nothing is fetched when the fingerprint is unchanged. Otherwise only rows
+    at or after the watermark are pulled and upserted; a full reload happens on
+    the first call, when incremental loading is disabled, or when the merged
+    frame no longer matches the warehouse row count (e.g. deleted findings).
+    """
+    store = _findings_store()
+    incremental = get_config("loader", "incremental", True)
+    with store["lock"]:
+        with db_connection(engine) as conn:
             raw_conn = conn.connection
-            df_master = pd.read_sql(query, raw_conn)
-        
-        df_exploded = df_master.copy()
-        df_map = df_master[['nama_lokasi', 'lat', 'lon']]
+            source, query, fingerprint_query = resolve_findings_source(raw_conn)
+            # Kept as strings so it round-trips through the snapshot metadata.
+            fingerprint = tuple(str(v) for v in _fetch_one(raw_conn, fingerprint_query))
+            df = store["df"]
+            if df is not None and source == store["source"] and fingerprint == store["fingerprint"]:
+                store.update(origin="warehouse", loaded_at=datetime.now(), error=None)
+                return df
+
+            changed = None
+            if df is None or not incremental or store["watermark"] is None or source != store["source"]:
+                df = _read_findings(raw_conn, query)
+            else:
+                delta = _read_findings(raw_conn, _delta_query(query), {"watermark": store["watermark"]})
+                df = _upsert_findings(df, delta)
+                if df['kode_temuan'].nunique() != int(fingerprint[0]):
+                    logger.info("Findings row count drifted from warehouse, running full reload")
+                    df = _read_findings(raw_conn, query)
+                else:
+                    logger.info("Merged %d changed findings since %s", len(delta), store["watermark"])
+                    changed = delta['kode_temuan']
+
+        df, memory_report = normalize_findings(df)
+        df = _publish_findings(store, df, changed=changed, fingerprint=fingerprint, source=source,
+                               memory_report=memory_report, origin="warehouse", loaded_at=datetime.now(), error=None)
+        _write_snapshot(df, store)
+        return df
+
+# --- SNAPSHOT CACHE ---
+def _snapshot_path():
+    return get_config("snapshot", "path", os.path.join(".cache", "findings.parquet"))
+
+def _write_snapshot(df, store):
+    """
+    Persists the preprocessed findings as Parquet plus a JSON sidecar
+    (load time, row count, source fingerprint). Written to a temp file and
+    renamed, so a crash mid-write never leaves a truncated snapshot behind.
+    """
+    if not get_config("snapshot", "enabled", True):
+        return
+    path = _snapshot_path()
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        df.to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+        meta = {
+            "loaded_at": store["loaded_at"].isoformat(timespec="seconds"),
+            "row_count": len(df),
+            "source": store["source"],
+            "fingerprint": list(store["fingerprint"]),
+        }
+        with open(path + ".json.tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path + ".json.tmp", path + ".json")
+    except Exception as e:
+        logger.warning("Could not write findings snapshot to %s: %s", path, e)
+
+def _restore_snapshot():
+    """Seeds the findings store from the on-disk snapshot. Returns True on success."""
+    if not get_config("snapshot", "enabled", True):
+        return False
+    path = _snapshot_path()
+    try:
+        with open(path + ".json") as f:
+            meta = json.load(f)
+        df = pd.read_parquet(path)
+    except (OSError, ValueError) as e:
+        logger.info("No usable findings snapshot at %s: %s", path, e)
+        return False
+
+    store = _findings_store()
+    with store["lock"]:
+        if store["df"] is None:
+            _publish_findings(store, df, fingerprint=tuple(meta["fingerprint"]),
+                              source=meta["source"], origin="snapshot",
+                              loaded_at=datetime.fromisoformat(meta["loaded_at"]))
+    return True
+
+def _background_refresh():
+    store = _findings_store()
+    try:
+        _sync_findings(get_db_engine())
+    except Exception as e:
+        logger.warning("Background refresh from warehouse failed: %s", e)
+        store["error"] = str(e)
+    finally:
+        # Also after a failure: the snapshot keeps being served until the next
+        # ttl_seconds check, instead of the next rerun retrying in the foreground.
+        store["checked_at"] = datetime.now()
+        store["refreshing"] = False
 
-        return df_exploded, df_master, df_map
+def _start_background_refresh():
+    store = _findings_store()
+    with store["lock"]:
+        if store["refreshing"]:
+            return
+        store["refreshing"] = True
+    threading.Thread(target=_background_refresh, daemon=True).start()
 
+def current_dataset():
+    """The shared FindingsDataset as currently loaded, without triggering a refresh."""
+    return _findings_store()["dataset"]
+
+def get_data_status():
+    """Load diagnostics for the shared findings dataset (source, timings, memory)."""
+    store = _findings_store()
+    dataset = store["dataset"]
+    return {
+        "version": dataset.version if dataset is not None else None,
+        "rows": len(dataset.master) if dataset is not None else 0,
+        "source": store["source"],
+        "origin": store["origin"],
+        "loaded_at": store["loaded_at"],
+        "checked_at": store["checked_at"],
+        "error": store["error"],
+        "load_stats": store["load_stats"],
+        "memory_report": store["memory_report"],
+    }
+
+def render_data_status():
+    """Shows a banner when pages are served from the snapshot instead of live warehouse data."""
+    store = _findings_store()
+    if store["loaded_at"] is None:
+        return
+    loaded_at = store["loaded_at"].strftime("%d %b %Y %H:%M")
+    if store["error"]:
+        st.warning(f"Data warehouse tidak dapat dihubungi. Menampilkan data per {loaded_at}.")
+    elif store["origin"] == "snapshot" and store["refreshing"]:
+        st.info(f"Menampilkan snapshot data per {loaded_at}. Data terbaru sedang dimuat dari data warehouse.")
+    elif store["origin"] == "snapshot":
+        st.warning(f"Menampilkan snapshot data per {loaded_at}.")
+
+def _refresh_due(store):
+    ttl = float(get_config("loader", "ttl_seconds", 3600))
+    return store["checked_at"] is None or (datetime.now() - store["checked_at"]).total_seconds() >= ttl
+
+def get_dataset():
+    """
+    Returns the shared FindingsDataset, syncing with the warehouse at most once
+    per `[loader] ttl_seconds`. Sessions that already have data never wait on a
+    refresh another session is running; they keep the current dataset.
+    """
+    store = _findings_store()
+    if store["dataset"] is None and _restore_snapshot():
+        # Serve the snapshot immediately; the warehouse load catches up in the background.
+        _start_background_refresh()
+        return store["dataset"]
+    if not _refresh_due(store) or (store["refreshing"] and store["dataset"] is not None):
+        return store["dataset"]
+
+    if not store["lock"].acquire(blocking=store["dataset"] is None):
+        return store["dataset"]
+    try:
+        if _refresh_due(store):
+            try:
+                _sync_findings(get_db_engine())
+            except Exception as e:
+                if store["dataset"] is None:
+                    raise
+                logger.warning("Warehouse refresh failed, serving last loaded findings: %s", e)
+                store["error"] = str(e)
+            store["checked_at"] = datetime.now()
+    finally:
+        store["lock"].release()
+    return store["dataset"]
+
+def load_data():
+    """
+    Loads data from the PostgreSQL Data Warehouse and preprocesses it 
+    to match the legacy CSV format expected by the Streamlit app.
+    Returns read-only references into the shared FindingsDataset.
+    Every page calls this first, so it also starts the rerun's timing record.
+    """
+    start_run()
+    try:
+        with timed("load_data") as t:
+            dataset = get_dataset()
+            t["rows"] = len(dataset.master) if dataset is not None else 0
     except Exception as e:
         st.error(f"Database Connection Error: {e}")
+        dataset = None
+    if dataset is None:
         return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+    return dataset.exploded, dataset.master, dataset.map
+
 
 
 def load_css():
@@ -223,7 +804,67 @@ def set_header_title(title):
     </style>
     """, unsafe_allow_html=True)
 
+def time_index(df):
+    """
+    The int64 epoch array of `df['tanggal']` when `df` is sorted by it, else None.
+    Precomputed for the shared dataset; frames cut from it by row filters stay
+    sorted, so theirs is derived in one vectorized pass.
+    """
+    if 'tanggal' not in df.columns:
+        return None
+    dataset = current_dataset()
+    if dataset is not None and df is dataset.master:
+        return dataset.time_index
+    epoch = _epoch_ns(df['tanggal'])
+    return epoch if _is_sorted(epoch) else None
+
+def _dataset_facet_filter(dataset, start_date, end_date, backend):
+    df = dataset.master
+    if backend == "duckdb":
+        con = get_duckdb_connection(df, dataset.version)
+        return DuckDBFacetFilter(con, df, start_date, end_date)
+    if dataset.time_index is not None:
+        return BitmapFacetFilter(dataset.facet_index, df, dataset.time_index, start_date, end_date)
+    return PandasFacetFilter(filter_by_date(df, start_date, end_date))
+
+def view_cache():
+    """The process-wide filtered-view cache, sized from `[cache]`."""
+    return get_view_cache(float(get_config("cache", "view_budget_mb", 256)),
+                          int(get_config("cache", "view_max_entries", 512)))
+
+def tile_url():
+    """
+    Satellite tile URL template for the folium maps: the local tile proxy
+    (`[tiles] url`, see tile_proxy.py) when configured, so the API key stays
+    on the server; Stadia directly with `[api] stadia` otherwise.
+    """
+    url = get_config("tiles", "url")
+    if url:
+        return url
+    return DEFAULT_UPSTREAM.replace("{api_key}", get_config("api", "stadia", ""))
+
+def map_cache():
+    """The process-wide rendered-map cache, sized from `[cache]`."""
+    return get_map_cache(float(get_config("cache", "map_budget_mb", 64)),
+                         int(get_config("cache", "map_max_entries", 64)))
+
+def facet_filter(dataset, df, start_date, end_date):
+    """
+    The sidebar's filter backend for `df` over start_date..end_date. On the
+    shared dataset it uses the bitmap index (or DuckDB when configured) behind
+    the cross-session view cache; any other frame falls back to plain boolean
+    masks.
+    """
+    if dataset is None or dataset.master is not df:
+        return PandasFacetFilter(filter_by_date(df, start_date, end_date))
+    backend = get_config("engine", "backend", "pandas")
+    return CachedFacetFilter(
+        view_cache(), (dataset.version, backend, start_date, end_date),
+        lambda: _dataset_facet_filter(dataset, start_date, end_date, backend),
+    )
+
 def filter_by_date(df, start_date, end_date):
+    """Rows whose `tanggal` falls on start_date..end_date (both inclusive)."""
     if 'tanggal' not in df.columns:
         return df
     # Ensure start_date and end_date are datetime.date objects
@@ -231,35 +872,99 @@ def filter_by_date(df, start_date, end_date):
         start_date = start_date.date()
     if isinstance(end_date, datetime):
         end_date = end_date.date()
-        
-    mask = (df['tanggal'].dt.date >= start_date) & (df['tanggal'].dt.date <= end_date)
+    epoch = time_index(df)
+    if epoch is not None:
+        # Sorted: the range is one contiguous slice, found by binary search.
+        lo, hi = date_bounds(epoch, start_date, end_date)
+        return df.iloc[lo:hi]
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    mask = (df['tanggal'] >= start) & (df['tanggal'] < end)
     return df.loc[mask]
 
-def calculate_kpi(df_master):
-    if df_master.empty:
-        return 0, 0, 0, 0
+def period_start(df, freq):
+    """
+    Start of each row's month ('M') or week ('W') bucket of `tanggal`, as a
+    Series aligned with `df`. On frames sorted by `tanggal` the bucket edges
+    are located with searchsorted instead of converting every row to a Period.
+    """
+    epoch = time_index(df)
+    if epoch is None:
+        return df['tanggal'].dt.to_period(freq).dt.to_timestamp().rename('Period')
+    n_dated = int(np.searchsorted(epoch, NAT_EPOCH, side='left'))
+    result = np.full(len(df), np.datetime64('NaT'), dtype='datetime64[ns]')
+    if n_dated:
+        first, last = df['tanggal'].iloc[0], df['tanggal'].iloc[n_dated - 1]
+        edges = pd.period_range(first.to_period(freq), last.to_period(freq), freq=freq).to_timestamp().as_unit('ns')
+        positions = np.searchsorted(epoch[:n_dated], edges.asi8, side='left')
+        result[:n_dated] = np.repeat(edges.to_numpy(), np.diff(np.append(positions, n_dated)))
+    return pd.Series(result, index=df.index, name='Period')
 
-    total_findings = df_master['kode_temuan'].nunique()
-    
-    if 'temuan_status' in df_master.columns:
-        closed_count = df_master[df_master['temuan_status'].str.lower() == 'closed'].shape[0]
-        closing_rate = (closed_count / total_findings) * 100 if total_findings > 0 else 0
-    else:
-        closing_rate = 0
+class FilterState(NamedTuple):
+    """
+    The sidebar selection as a hashable value, stored in
+    st.session_state['filter_state'] so other layers can key caches on it
+    or compile it to SQL. Empty tuples / None mean "All".
+    """
+    start_date: date
+    end_date: date
+    categories: Tuple[str, ...] = ()
+    statuses: Tuple[str, ...] = ()
+    locations: Tuple[str, ...] = ()
+    department: Optional[str] = None
 
-    mttr = 0 
-    participation = 0
-    if 'creator_name' in df_master.columns:
-        participation = df_master['creator_name'].nunique()
-        
-    return total_findings, closing_rate, mttr, participation
+def _selection(selected):
+    return () if not selected or 'All' in selected else tuple(sorted(selected))
 
+# (column, label, multiselect?) of the sidebar facets, in display order.
+SIDEBAR_FACETS = (
+    ('temuan_kategori', "Kategori Temuan", True),
+    ('temuan_status', "Status Temuan", True),
+    ('nama_lokasi', "Area/Lokasi", True),
+    ('creator_departemen', "Department", False),
+)
+
+def _facet_options(df, column):
+    """
+    Every value of `column` in the dataset, independent of the other facets.
+    Options and labels must not change with the selection: on Streamlit
+    releases without key-based widget identity, a widget whose options or
+    labels change gets a new ID and silently loses its selection.
+    """
+    values = df[column].cat.categories if isinstance(df[column].dtype, pd.CategoricalDtype) \
+        else df[column].dropna().unique()
+    return sorted(str(v) for v in values)
+
+def _facet_caption(counts, selected, limit=5):
+    """How many findings the selected values (else the top `limit` values) match under the other facets."""
+    shown = list(selected) or sorted(counts, key=lambda v: (-counts[v], v))[:limit]
+    text = " · ".join(f"{v} ({counts.get(v, 0)})" for v in shown)
+    hidden = len(set(counts) - set(shown))
+    return f"{text} · +{hidden} lainnya" if hidden else text
+
+def get_filter_state():
+    """Returns the FilterState of the last sidebar render in this session, or None."""
+    return st.session_state.get('filter_state')
+
+def sidebar_view_key(df):
+    """
+    View-cache key of `df` when it is the frame render_sidebar returned in this
+    session over the shared dataset, so derived results can be cached with it.
+    None for any other frame.
+    """
+    view = st.session_state.get('_sidebar_view')
+    if view is None or view[1] is not df:
+        return None
+    return view[0]
+
+@instrument("render_sidebar")
 def render_sidebar(df_master, df_exploded):
     """
     Renders the sidebar filters and returns filtered dataframes.
     Also injects the global CSS.
     """
     load_css()
+    render_data_status()
     
     # Reverted to Wikimedia Logo as requested
     st.sidebar.image("./asset/logo-pln.png", width=200)        
@@ -292,39 +997,56 @@ def render_sidebar(df_master, df_exploded):
     start_date, end_date = date_range if len(date_range) == 2 else (min_date, max_date)
 
     # Apply Date Filter
-    df_master_filtered = filter_by_date(df_master, start_date, end_date)
-    
-    # 1. Kategori Temuan
-    if 'temuan_kategori' in df_master_filtered.columns:
-        cats = ['All'] + sorted(df_master_filtered['temuan_kategori'].astype(str).unique().tolist())
-        sel_cats = st.sidebar.multiselect("Kategori Temuan", cats)
-        if sel_cats and 'All' not in sel_cats:
-            df_master_filtered = df_master_filtered[df_master_filtered['temuan_kategori'].isin(sel_cats)]
-            
-    # 2. Status Temuan
-    if 'temuan_status' in df_master_filtered.columns:
-        statuses = ['All'] + sorted(df_master_filtered['temuan_status'].astype(str).unique().tolist())
-        sel_stats = st.sidebar.multiselect("Status Temuan", statuses)
-        if sel_stats and 'All' not in sel_stats:
-            df_master_filtered = df_master_filtered[df_master_filtered['temuan_status'].isin(sel_stats)]
-            
-    # 3. Area/Lokasi
-    if 'nama_lokasi' in df_master_filtered.columns:
-        locs = ['All'] + sorted(df_master_filtered['nama_lokasi'].astype(str).unique().tolist())
-        sel_locs = st.sidebar.multiselect("Area/Lokasi", locs)
-        if sel_locs and 'All' not in sel_locs:
-            df_master_filtered = df_master_filtered[df_master_filtered['nama_lokasi'].isin(sel_locs)]
-
-    if 'creator_departemen' in df_master.columns:
-        depts = ['All'] + sorted(df_master_filtered['creator_departemen'].dropna().astype(str).unique().tolist())
-        selected_dept = st.sidebar.selectbox("Department", depts)
-        if selected_dept != 'All':
-            df_master_filtered = df_master_filtered[df_master_filtered['creator_departemen'] == selected_dept]
-
-    if not df_master_filtered.empty:
+    facets = facet_filter(current_dataset(), df_master, start_date, end_date)
+
+    # Widgets keep their value in session_state, so every facet's selection is
+    # known up front and all option counts come from one facet_counts() call.
+    facets_shown = [f for f in SIDEBAR_FACETS if f[0] in df_master.columns]
+    selected = {}
+    for column, _, multi in facets_shown:
+        value = st.session_state.get(f"facet_{column}")
+        values = _selection(value) if multi else (() if value in (None, 'All') else (value,))
+        if values:
+            selected[column] = values
+            facets.isin(column, values)
+    counts = facets.facet_counts([f[0] for f in facets_shown])
+
+    for column, label, multi in facets_shown:
+        column_counts = counts.get(column, {})
+        options = ['All'] + sorted(set(_facet_options(df_master, column)) | set(selected.get(column, ())))
+        if multi:
+            st.sidebar.multiselect(label, options, key=f"facet_{column}")
+        else:
+            st.sidebar.selectbox(label, options, key=f"facet_{column}")
+        # Counts go in a caption, not the option labels, so the widget identity stays stable.
+        if column_counts or column in selected:
+            st.sidebar.caption(_facet_caption(column_counts, selected.get(column, ())))
+
+    df_master_filtered = facets.result()
+    if isinstance(facets, CachedFacetFilter):
+        st.session_state['_sidebar_view'] = (facets.view_key, df_master_filtered)
+    else:
+        st.session_state.pop('_sidebar_view', None)
+
+    st.session_state['filter_state'] = FilterState(
+        start_date=start_date,
+        end_date=end_date,
+        categories=selected.get('temuan_kategori', ()),
+        statuses=selected.get('temuan_status', ()),
+        locations=selected.get('nama_lokasi', ()),
+        department=selected.get('creator_departemen', (None,))[0],
+    )
+
+    if df_exploded is df_master:
+        # Shared dataset: exploded and master are the same frame, no semi-join needed.
+        df_exploded_filtered = df_master_filtered
+    elif not df_master_filtered.empty:
         valid_ids = df_master_filtered['kode_temuan'].unique()
         df_exploded_filtered = df_exploded[df_exploded['kode_temuan'].isin(valid_ids)]
     else:
         df_exploded_filtered = pd.DataFrame(columns=df_exploded.columns)
+
+    if get_config("perf", "panel", False):
+        render_panel()
             
     return df_master_filtered, df_exploded_filtered, granularity
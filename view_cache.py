@@ -0,0 +1,169 @@
+"""
+Process-wide LRU cache of filtered views.
+
+render_sidebar looks the facet counts and the filtered frame up here, keyed
+on (dataset version, engine backend, date range, selections), so a filter
+combination that any session has already built is served without
+touching the data. Entries are evicted least-recently-used once either the
+memory budget or the entry limit is exceeded:
+
+    [cache]
+    view_budget_mb = 256
+    view_max_entries = 512
+
+A new dataset version makes all older keys unreachable; they age out of the
+LRU instead of being purged. get_map_cache() is a second, separately
+budgeted instance holding rendered map HTML.
+"""
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+# Rough size of one cached facet count (dict slot + short string + int).
+_OPTION_BYTES = 64
+
+
+def _nbytes(value):
+    """Approximate memory of a cached value. Frames sharing buffers with master are still counted."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, tuple):
+        return sum(_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values()) + len(value) * _OPTION_BYTES
+    return _OPTION_BYTES
+
+
+def _detach(value):
+    # Pages may add columns to what they get back; a shallow copy keeps that
+    # off the cached object (buffers stay shared under copy-on-write).
+    if isinstance(value, pd.DataFrame):
+        return value.copy(deep=False)
+    if isinstance(value, tuple):
+        return tuple(_detach(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _detach(v) for k, v in value.items()}
+    return value
+
+
+class ViewCache:
+    """Thread-safe LRU mapping with a byte budget and hit/miss/eviction counters."""
+
+    def __init__(self, max_bytes, max_entries):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """The cached value for `key`, or None (counted as a miss)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return _detach(entry[0])
+
+    def put(self, key, value):
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return
+        value = _detach(value)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+@st.cache_resource
+def get_view_cache(budget_mb=256, max_entries=512):
+    """The ViewCache shared by every session in this process (one per configured budget)."""
+    return ViewCache(int(budget_mb * 1024 * 1024), int(max_entries))
+
+
+@st.cache_resource
+def get_map_cache(budget_mb=64, max_entries=64):
+    """The process-wide cache of rendered map HTML (see geo.cached_map_html)."""
+    return ViewCache(int(budget_mb * 1024 * 1024), int(max_entries))
+
+
+class CachedFacetFilter:
+    """
+    Wraps a facet filter so facet counts and the result go through the view
+    cache. The underlying filter is only built (and earlier selections
+    replayed on it) on the first miss.
+    """
+
+    def __init__(self, cache, key, make_filter):
+        self.cache = cache
+        self.key = key
+        self.make_filter = make_filter
+        self.selections = ()
+        self._inner = None
+
+    def _filter(self):
+        if self._inner is None:
+            self._inner = self.make_filter()
+            for column, values in self.selections:
+                self._inner.isin(column, values)
+        return self._inner
+
+    @property
+    def view_key(self):
+        """Identifies the current selection; results derived from it can be cached under this key."""
+        return (self.key, self.selections)
+
+    def facet_counts(self, columns):
+        key = (self.view_key, "counts", tuple(columns))
+        return self.cache.get_or_compute(key, lambda: self._filter().facet_counts(columns))
+
+    def isin(self, column, values):
+        values = tuple(sorted(str(v) for v in values))
+        self.selections += ((column, values),)
+        if self._inner is not None:
+            self._inner.isin(column, values)
+
+    def result(self):
+        return self.cache.get_or_compute((self.view_key, "result"), lambda: self._filter().result())